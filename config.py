@@ -10,6 +10,7 @@ RAW_CODE_DESC_DIR = os.path.join(RAW_DATA_DIR, 'code_descriptions')  # Code desc
 LOG_DIR = os.path.join(BASE_DIR, 'logs')                    # Logs directory
 DROPPED_RAW_DATA_DIR = os.path.join(BASE_DIR, 'data', 'dropped_raw')  # Dropped/invalid data
 RAW_DELAY_DIR = os.path.join(RAW_DATA_DIR, 'delays')       # Raw delay data files
+RAW_SHEET_CACHE_DIR = os.path.join(DATA_DIR, 'cache', 'raw_sheets')  # Parsed raw sheets keyed by file content hash
 EXPORTS_DIR = os.path.join(BASE_DIR,'exports')             # Export directory for stats and plots, for website
 
 # Processed data directories
@@ -37,6 +38,9 @@ REFERENCE_COLS_ORDERED = [
     'Min Delay', 'Min Gap', 'Bound', 'Line', 'Vehicle'
 ]
 
+# Columns identifying a cleaned delay record, used to de-duplicate incremental runs against processed data
+DUPLICATE_KEY_COLS = ['DateTime', 'Station', 'Code', 'Min Delay', 'Min Gap', 'Bound', 'Line', 'Vehicle']
+
 # Valid bounds:
 VALID_BOUND_LIST = ['N', 'S', 'E', 'W']
 
@@ -1,5 +1,6 @@
 import pandas as pd
 from config import VALID_UNITS, CONVERSION_FACTORS
+from utils.ttc_loader import select_years
 
 def generate_general_delay_stats(df:pd.DataFrame, year_start: int, year_end: int,
                                  delay_code: list= None, unit: str = "minutes") ->dict:
@@ -29,7 +30,8 @@ def generate_general_delay_stats(df:pd.DataFrame, year_start: int, year_end: int
     # conversion factor
     factors = CONVERSION_FACTORS
 
-    df = df[df['DateTime'].dt.year.between(year_start, year_end)].copy()
+    # binary search on the DateTime-sorted data
+    df = select_years(df, year_start, year_end)
 
     # Filter by delay code if specified
     if delay_code:
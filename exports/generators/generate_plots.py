@@ -7,14 +7,15 @@ from viz.eda_plots import (plot_total_delay_by_year, plot_delay_category_trend_b
                            plot_weekday_weekend_trends_by_year, plot_delay_category_trend_for_major_delay,
                            plot_total_delay_count_by_year, plot_avg_delay_time_by_year)
 from viz.eda_utils import fig_to_html
-from utils.ttc_loader import TTCLoader
+from utils.ttc_loader import TTCLoader, enable_copy_on_write
 from config import EXPORTS_PLOTS_DIR
 
 
 # ensure folder exists
 os.makedirs(EXPORTS_PLOTS_DIR, exist_ok=True)
 
-# load data
+# load data; copy-on-write keeps writes to the loaded frames out of the loaded data
+enable_copy_on_write()
 loader = TTCLoader()
 df = loader.df
 
@@ -1,12 +1,16 @@
-import os.path
+import os
+
+import pandas as pd
 
 from config import EXPORTS_STATS_DIR
 from line_stats import generate_all_line_stats
 from station_stats import (generate_all_station_stats, check_dataset_complete,
                            generate_all_code_specific_station_stats, )
 from general_delay_stats import (generate_general_delay_stats, generate_code_specific_general_delay_stats)
+from utils import shared_dataset
 from utils.file_utils import write_to_json
-from utils.ttc_loader import TTCLoader
+from utils.task_graph import run_task_graph
+from utils.ttc_loader import TTCLoader, enable_copy_on_write
 
 """
 Generates the following stats and saves them in JSON file:
@@ -50,57 +54,115 @@ Generates the following stats and saves them in JSON file:
 """
 
 
-def generate_stats():
-    os.makedirs(EXPORTS_STATS_DIR, exist_ok=True)
-    # load data
-    loader = TTCLoader()
-    df = loader.df
-    df["Year"] = df["DateTime"].dt.year
+# columns used by the stats generators
+STATS_COLUMNS = ["DateTime", "Station", "Code", "Min Delay", "Line", "Bound", "Rush Hour", "IsWeekday"]
 
-    # generate station stats
-    is_complete = check_dataset_complete(df) # check if the latest year is over
-    if is_complete:
-        year = df["Year"].max()
-    else:
-        year = df["Year"].max() - 1
-
-    # station stats for the latest complete year
-    stations_stats = generate_all_station_stats(df=df,year=year, unit = "hours")
-    filepath = os.path.join(EXPORTS_STATS_DIR, 'stations_stats.json')
-    write_to_json(filepath, stations_stats)
-
-    # station stats for the latest year (even if the year is incomplete) for leaderboard
-    year = df["Year"].max()
-    stations_stats_for_leaderboard = generate_all_station_stats(df=df,year=year, unit = "hours")
-    filepath = os.path.join(EXPORTS_STATS_DIR, 'leaderboard_stations_stats.json')
-    write_to_json(filepath, stations_stats_for_leaderboard)
-
-    # delay code specific stats for the last three years
+# delay data of this process, set by `_attach_delays` in each worker of the export pool
+_df = None
+
+def _add_year(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds the Year column used by the stats generators
+    :param df: pd.DataFrame of TTC delays
+    :return: pd.DataFrame with Year column
+    """
+    df["Year"] = df["DateTime"].dt.year
+    return df
+
+def _attach_delays(path: str):
+    """
+    Attaches the worker process to the delay data shared by `generate_stats`
+    :param path: path of the shared data
+    """
+    global _df
+    _df = _add_year(TTCLoader.from_shared(path).df)
+
+def _export_stats(filename: str, generator, **kwargs) -> str:
+    """
+    Runs a stats generator on the delay data and saves its stats as JSON in EXPORTS_STATS_DIR
+    :param filename: JSON file name, e.g. line_stats.json
+    :param generator: stats generator taking the delay data as df, e.g. generate_all_line_stats
+    :param kwargs: other arguments of the generator
+    :return: path of the JSON file
+    """
+    filepath = os.path.join(EXPORTS_STATS_DIR, filename)
+    write_to_json(filepath, generator(df=_df, **kwargs))
+    return filepath
+
+def generate_stats(year_start: int = 2023, year_end: int = 2025, parallel: bool = True,
+                   max_workers: int | None = None) -> dict:
+    """
+    Generates the stats above and saves them in EXPORTS_STATS_DIR. The exports are independent: each runs as a task
+    on the loaded delay data, and a failing export does not stop the others.
+    :param year_start: first year of the multi-year stats
+    :param year_end: last year of the multi-year stats
+    :param parallel: if True, run the exports concurrently in a process pool attached to the shared delay data. Falls
+    back to running them one after the other on a single-CPU machine, where the pool only adds overhead.
+    :param max_workers: number of worker processes when parallel, defaults to the number of CPUs
+    :return: dict of export name to its status, run time in seconds and error
+    :raises RuntimeError: if an export failed, after all the others have finished
+    """
+    global _df
+    os.makedirs(EXPORTS_STATS_DIR, exist_ok=True)
+    # station stats for the latest complete year, and for the latest year (even if incomplete) for the leaderboard
+    available_years = TTCLoader(autoload=False).available_years()
+    latest_year = max(available_years)
+    latest_year_df = _add_year(TTCLoader(years=[latest_year], columns=["DateTime"]).df)
+    complete_year = latest_year if check_dataset_complete(latest_year_df) else latest_year - 1
+
+    # load only the columns used, and the years from year_start or the latest complete year onwards
+    years = [y for y in available_years if y >= min(year_start, complete_year)]
+    loader = TTCLoader(years=years, columns=STATS_COLUMNS)
+    _df = _add_year(loader.df)
+
+    # delay code specific stats for year_start to year_end
     code_dict = {"Track Intrusion": ["SUUT", "MUPR1"],"Disorderly Patron" : ["SUDP"], "Fire: Track Level" : ["MUPLB"]}
-    code_specific_station_stats = (
-        generate_all_code_specific_station_stats(df, 2023, 2025, code_dict, 10, "hours"))
-    filepath = os.path.join(EXPORTS_STATS_DIR, 'code_specific_station_stats.json')
-    write_to_json(filepath, code_specific_station_stats)
-
-    # line stats for the last three years
-    line_stats = generate_all_line_stats(df, 2023, 2025)
-    filepath = os.path.join(EXPORTS_STATS_DIR, 'line_stats.json')
-    write_to_json(filepath, line_stats)
-
-    # general delay stats for the last three years
-    general_delay_stats = generate_general_delay_stats(df = df, year_start= 2023, year_end= 2025, unit = "minutes")
-    filepath = os.path.join(EXPORTS_STATS_DIR, 'general_delay_stats.json')
-    write_to_json(filepath, general_delay_stats)
-
-    # code specific general delay stats for the last three years
-    code_dict = {"Track Intrusion": ["SUUT", "MUPR1"], "Disorderly Patron": ["SUDP"], "Fire: Track Level": ["MUPLB"]}
-    code_specific_general_delay_stats = (
-        generate_code_specific_general_delay_stats(df= df, year_start= 2023, year_end = 2025,
-                                                   code_dict = code_dict, unit = "minutes"))
-    filepath = os.path.join(EXPORTS_STATS_DIR, 'code_specific_general_delay_stats.json')
-    write_to_json(filepath, code_specific_general_delay_stats)
+    exports = {
+        "station_stats": ("stations_stats.json", generate_all_station_stats,
+                          {"year": complete_year, "unit": "hours"}),
+        "leaderboard_station_stats": ("leaderboard_stations_stats.json", generate_all_station_stats,
+                                      {"year": latest_year, "unit": "hours"}),
+        "code_specific_station_stats": ("code_specific_station_stats.json", generate_all_code_specific_station_stats,
+                                        {"year_start": year_start, "year_end": year_end, "code_dict": code_dict,
+                                         "top_n": 10, "unit": "hours"}),
+        "line_stats": ("line_stats.json", generate_all_line_stats,
+                       {"year_start": year_start, "year_end": year_end}),
+        "general_delay_stats": ("general_delay_stats.json", generate_general_delay_stats,
+                                {"year_start": year_start, "year_end": year_end, "unit": "minutes"}),
+        "code_specific_general_delay_stats": ("code_specific_general_delay_stats.json",
+                                              generate_code_specific_general_delay_stats,
+                                              {"year_start": year_start, "year_end": year_end,
+                                               "code_dict": code_dict, "unit": "minutes"}),
+    }
+    tasks = {name: {"func": _export_stats, "kwargs": {"filename": filename, "generator": generator, **kwargs}}
+             for name, (filename, generator, kwargs) in exports.items()}
+
+    if parallel and (os.cpu_count() or 1) == 1:
+        print("Single CPU: running the stats exports one after the other")
+        parallel = False
+
+    # workers attach to one shared copy of the delay data instead of each receiving their own
+    path = loader.share() if parallel else None
+    try:
+        reports = run_task_graph(tasks, parallel=parallel, max_workers=max_workers,
+                                 initializer=_attach_delays if parallel else None, initargs=(path,))
+    finally:
+        if path is not None:
+            shared_dataset.release_dataframe(path)
+
+    reports = {name: {key: report[key] for key in ("status", "seconds", "error")} for name, report in reports.items()}
+    for name, report in reports.items():
+        seconds = "" if report["seconds"] is None else f" in {report['seconds']:.2f}s"
+        print(f"{name}: {report['status']}{seconds}")
+
+    failed = [name for name, report in reports.items() if report["status"] != "ok"]
+    if failed:
+        raise RuntimeError(f"Stats exports failed: {failed}\n" +
+                           "\n".join(reports[name]["error"] for name in failed))
+    return reports
 
 if __name__=="__main__":
+    enable_copy_on_write()
     generate_stats()
 
 
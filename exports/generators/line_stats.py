@@ -1,32 +1,29 @@
+import numpy as np
 import pandas as pd
 from config import VALID_LINECODES_TO_BOUND_DICT
 from scipy.stats import poisson
+from utils.ttc_loader import select_years
 
 def solve_for_k(lmbda, p=0.9):
     """
     Find the smallest k such that P(X <= k) >= p
-    for X ~ Poisson(lmbda).
+    for X ~ Poisson(lmbda), for one or an array of lambdas.
     """
-    k = 0
-    while poisson.cdf(k, lmbda) < p:
-        k += 1
-    return k
+    return poisson.ppf(p, lmbda).astype(int)
 
 def round_to_nearest_5(x):
-    """Round number to nearest 5"""
-    num = int(round(x / 5.0)) * 5
-    if num ==0:
-        return 5
-    return num
+    """Round numbers to nearest 5, with 5 as the minimum"""
+    num = np.round(np.asarray(x) / 5.0).astype(int) * 5
+    return np.where(num == 0, 5, num)
 
 WEEKEND_SERVICE_HOURS = 19   # avg span across Sat (~20h) & Sun (~18h)
 WEEKEND_EXPOSURE_HOURS = 5   # chosen comparable to weekday exposure window
 
-def freq_of_delays(row) -> float:
+def freq_of_delays(rush_stats: pd.DataFrame) -> pd.Series:
     """
-    Compute lambda (expected number of delay events) for this time bucket.
-    :param row : pd.Series containing "Rush Hour", "number_of_delays", "days_in_dataset"
-    :return expected no. of delays in a time bucket.
+    Compute lambda (expected number of delay events) for each time bucket.
+    :param rush_stats : pd.DataFrame containing "Rush Hour", "number_of_delays", "days_in_dataset"
+    :return expected no. of delays per time bucket.
     Rationale:
     - Weekday buckets (Morning / Off-peak: Afternoon / Evening / Off-peak: Night)
       already count delays within that specific 3–7h window. Dividing total delays per bucket by the number
@@ -38,12 +35,87 @@ def freq_of_delays(row) -> float:
           (delays per weekend day ÷ 19 hours) × 5 hours.
       This yields a λ for a 5-hour weekend window instead of the whole day.
     """
+    # Weekday windows: number_of_delays already refers to that bucket only.
+    per_day = rush_stats["number_of_delays"] / rush_stats["days_in_dataset"]
+
     # Normalize weekend “per day” to a 5-hour slice:
-    if row["Rush Hour"] == "Weekend":
-        return ((row["number_of_delays"] / row["days_in_dataset"]) / 19) * 5
+    is_weekend = rush_stats["Rush Hour"] == "Weekend"
+    return per_day.where(~is_weekend, (per_day / WEEKEND_SERVICE_HOURS) * WEEKEND_EXPOSURE_HOURS)
 
-    # Weekday windows: number_of_delays already refers to that bucket only.
-    return row["number_of_delays"] / row["days_in_dataset"]
+def rush_hour_stats(df_year: pd.DataFrame) -> pd.DataFrame:
+    """
+    Computes the stats of every line, bound and time window (e.g Line: YU, Bound: N, Rush Hour: Evening) in one
+    grouped pass. Only the valid bounds of each line are kept.
+    :param df_year: pd.DataFrame filtered by years (e.g 2023-2025)
+    :return: pd.DataFrame with a row per line, bound and time window, ordered by line, bound and time window
+    """
+    valid_pairs = pd.MultiIndex.from_tuples(
+        [(line, b) for line, bounds in VALID_LINECODES_TO_BOUND_DICT.items() for b in bounds], names=["Line", "Bound"])
+    delays = pd.DataFrame({
+        "Line": df_year["Line"].astype(str).to_numpy(),
+        "Bound": df_year["Bound"].astype(str).to_numpy(),
+        "Rush Hour": df_year["Rush Hour"].to_numpy(),
+        "Min Delay": df_year["Min Delay"].to_numpy(),
+        "IsWeekday": df_year["IsWeekday"].to_numpy(),
+        "Day": df_year["DateTime"].dt.normalize().to_numpy(),
+    })
+    delays = delays[pd.MultiIndex.from_arrays([delays["Line"], delays["Bound"]]).isin(valid_pairs)]
+
+    rush_stats = (
+        delays.groupby(["Line", "Bound", "Rush Hour"], observed=True)["Min Delay"]
+        .agg(
+            number_of_delays="count",
+            total_delay_minutes="sum",
+            avg_delay_minutes="median" # median to account for major delays
+        )
+        .reset_index()
+    )
+
+    rush_stats["bound"] = rush_stats["Bound"]
+    rush_stats["total_delay_minutes"] = rush_stats["total_delay_minutes"].round(2)
+    rush_stats["avg_delay_minutes"] = rush_stats["avg_delay_minutes"].round(2)
+
+    # number of weekdays and weekends in our dataframe, per line and bound
+    days = delays.groupby(["Line", "Bound", "IsWeekday"])["Day"].nunique()
+
+    # add column that shows the number of days for that rush hour time frame
+    # e.g. Morning: 500 days, weekends 200 days
+    is_weekday = (rush_stats["Rush Hour"] != "Weekend").to_numpy()
+    day_keys = pd.MultiIndex.from_arrays([rush_stats["Line"], rush_stats["Bound"], is_weekday])
+    rush_stats["days_in_dataset"] = days.reindex(day_keys, fill_value=0).to_numpy()
+
+    # lambda for this time window: expected number of delay events (Poisson rate)
+    rush_stats["expected_delays"] = freq_of_delays(rush_stats)
+
+    # Chance your trip encounters at least one delay in this time window: P(X ≥ 1) for X~Poisson(λ)
+    rush_stats["p_any_delay"] = (
+            1 - poisson.pmf(0, rush_stats["expected_delays"])
+    ).round(3)
+
+    # 90th-percentile delay count: smallest k with P(X ≤ k) ≥ 0.90
+    # (i.e., only 10% of trips would have more than k delays)
+    rush_stats["k_at_90pct"] = solve_for_k(rush_stats["expected_delays"].to_numpy())
+
+    # Recommended padding: typical single-delay minutes × p90 delay count
+    rush_stats["recommended_buffer_min"] = rush_stats["avg_delay_minutes"] * rush_stats["k_at_90pct"]
+
+    # Round the recommended padding to nearest 5 min
+    rush_stats["recommended_buffer_min"] = round_to_nearest_5(rush_stats["recommended_buffer_min"])
+
+    return rush_stats
+
+def _line_stats_from_table(rush_stats: pd.DataFrame, line_name: str) -> dict:
+    """
+    Formats the rows of `rush_hour_stats` for a line as bound: list of records
+    :param rush_stats: pd.DataFrame from `rush_hour_stats`
+    :param line_name: name of line, e.g ("YU")
+    :return: dict containing stats
+    """
+    bound_stats = {}
+    for b in VALID_LINECODES_TO_BOUND_DICT[line_name]:
+        rows = rush_stats[(rush_stats["Line"] == line_name) & (rush_stats["Bound"] == b)]
+        bound_stats[b] = rows.drop(columns=["Line", "Bound"]).to_dict(orient="records")
+    return {line_name: bound_stats}
 
 def line_stats(df_year_line:pd.DataFrame, line_name: str) ->dict | None:
     """
@@ -61,64 +133,7 @@ def line_stats(df_year_line:pd.DataFrame, line_name: str) ->dict | None:
     :param line_name: name of line, e.g ("YU")
     :return: dict containing stats
     """
-    results = {}
-
-    # bound-specific stats
-    bound_stats = {}
-    bounds = VALID_LINECODES_TO_BOUND_DICT[line_name]
-
-    for b in bounds:
-        df_bound = df_year_line[df_year_line["Bound"] == b]
-
-        rush_stats = (
-            df_bound.groupby("Rush Hour")["Min Delay"]
-            .agg(
-                number_of_delays="count",
-                total_delay_minutes="sum",
-                avg_delay_minutes="median" # median to account for major delays
-            )
-            .reset_index()
-        )
-
-        rush_stats["bound"] = b
-        rush_stats["total_delay_minutes"] = rush_stats["total_delay_minutes"].round(2)
-        rush_stats["avg_delay_minutes"] = rush_stats["avg_delay_minutes"].round(2)
-
-        # number of weekdays and weekends in our dataframe
-        num_weekdays = df_bound.loc[df_bound["IsWeekday"], "DateTime"].dt.date.nunique()
-        num_weekends = df_bound.loc[~df_bound["IsWeekday"], "DateTime"].dt.date.nunique()
-
-        def pick_days(row):
-            """Number of weekdays or weekends"""
-            return num_weekends if row["Rush Hour"] == "Weekend" else num_weekdays
-
-        # add column that shows the number of days for that rush hour time frame
-        # e.g. Morning: 500 days, weekends 200 days
-        rush_stats["days_in_dataset"] = rush_stats.apply(pick_days, axis=1)
-
-        # lambda for this time window: expected number of delay events (Poisson rate)
-        rush_stats["expected_delays"] = rush_stats.apply(freq_of_delays,axis = 1)
-
-        # Chance your trip encounters at least one delay in this time window: P(X ≥ 1) for X~Poisson(λ)
-        rush_stats["p_any_delay"] = (
-                1 - poisson.pmf(0, rush_stats["expected_delays"])
-        ).round(3)
-
-        # 90th-percentile delay count: smallest k with P(X ≤ k) ≥ 0.90
-        # (i.e., only 10% of trips would have more than k delays)
-        rush_stats["k_at_90pct"] = rush_stats["expected_delays"].apply(solve_for_k)
-
-        # Recommended padding: typical single-delay minutes × p90 delay count
-        rush_stats["recommended_buffer_min"] = rush_stats["avg_delay_minutes"] * rush_stats["k_at_90pct"]
-
-        # Round the recommended padding to nearest 5 min
-        rush_stats["recommended_buffer_min"] = rush_stats["recommended_buffer_min"].apply(round_to_nearest_5)
-
-        bound_stats[b] = rush_stats.to_dict(orient="records")
-
-    results[line_name] = bound_stats
-
-    return results
+    return _line_stats_from_table(rush_hour_stats(df_year_line), line_name)
 
 def generate_all_line_stats(df: pd.DataFrame, year_start: int, year_end: int, unit: str = "minutes") -> dict:
     """
@@ -138,18 +153,12 @@ def generate_all_line_stats(df: pd.DataFrame, year_start: int, year_end: int, un
     :param unit: units for time output
     :return: dict containing all line stats
     """
-    line_stats_list =[]
-    df = df.copy()
-    df["Year"] = df["DateTime"].dt.year
-    years = range(year_start, year_end + 1)
-    df = df[df["Year"].isin(years)]
-
+    # binary search on the DateTime-sorted data
+    df = select_years(df, year_start, year_end)
 
-    lines= VALID_LINECODES_TO_BOUND_DICT.keys()
+    # stats of all lines, bounds and time windows at once
+    rush_stats = rush_hour_stats(df)
 
-    for line in lines:
-        df_line =  df[df["Line"] == line]
-        stats = line_stats(df_line, line)
-        line_stats_list.append(stats)
+    line_stats_list = [_line_stats_from_table(rush_stats, line) for line in VALID_LINECODES_TO_BOUND_DICT]
 
-    return {"line stats": line_stats_list}
\ No newline at end of file
+    return {"line stats": line_stats_list}
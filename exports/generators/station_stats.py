@@ -1,10 +1,109 @@
+import numpy as np
 import pandas as pd
 from config import VALID_STATIONS_FILE, PROCESSED_CODE_DESCRIPTIONS_FILE
 from utils import file_utils
 from utils.file_utils import read_txt_to_list
 from utils.clean_utils import delay_code_category_dict, valid_station_linecode_dict
+from utils.ttc_loader import select_years
 
 
+# conversion factor from minutes
+TIME_UNIT_FACTORS = {
+    "minutes": 1,
+    "hours": 60,
+    "days": 60 * 24,
+}
+
+def _top_codes(codes: pd.DataFrame, order: str, value: str) -> pd.DataFrame:
+    """
+    Picks the top delay code of each station from its per-code stats. The codes of each station are listed in `order`
+    and sorted by `value` with the same descending sort as a per-station value_counts or groupby, so ties go to the
+    same code.
+    :param codes: pd.DataFrame of per-station, per-code stats with Station and Code columns
+    :param order: column giving the order the codes are listed in before sorting
+    :param value: column to rank the codes by
+    :return: pd.DataFrame with the row of the top code, indexed by station
+    """
+    codes = codes.sort_values(["Station", order], kind="stable").reset_index(drop=True)
+    top = [station_codes.sort_values(value, ascending=False).index[0]
+           for _, station_codes in codes.groupby("Station", sort=False)]
+    return codes.loc[top].set_index("Station")
+
+def station_stats_table(df_year: pd.DataFrame) -> pd.DataFrame:
+    """
+    Computes the delay stats of every station in one grouped pass:
+    - total delays
+    - time lost in minutes
+    - number of major delays (>= 20min)
+    - top delay code by count and the minutes lost to it
+    - top delay code by time lost and the minutes lost to it
+    Ties between codes are broken as by the per-station `value_counts` and `groupby("Code")` they replace.
+    :param df_year: pd.DataFrame filtered by year
+    :return: pd.DataFrame indexed by station
+    """
+    delays = pd.DataFrame({
+        "Station": df_year["Station"].to_numpy(),
+        "Code": df_year["Code"].to_numpy(),
+        "Min Delay": df_year["Min Delay"].to_numpy(),
+        "Major": (df_year["Min Delay"] >= 20).to_numpy(),
+        "Position": np.arange(len(df_year)),
+    })
+
+    stations = delays.groupby("Station", observed=True).agg(
+        total_delays=("Min Delay", "size"),
+        time_lost=("Min Delay", "sum"),
+        major_delays=("Major", "sum"),
+    )
+
+    # number of delays and time lost per station and code
+    codes = delays.groupby(["Station", "Code"], observed=True).agg(
+        count=("Min Delay", "size"),
+        delay=("Min Delay", "sum"),
+        first=("Position", "min"),
+    ).reset_index()
+    codes["Code"] = codes["Code"].astype(str)
+
+    # value_counts lists codes in order of first occurrence, groupby("Code") in code order
+    by_count = _top_codes(codes, "first", "count")
+    by_time = _top_codes(codes, "Code", "delay")
+
+    stations["top_code_by_count"] = by_count["Code"]
+    stations["top_code_by_count_delay"] = by_count["delay"]
+    stations["top_code_by_time"] = by_time["Code"]
+    stations["top_code_by_time_delay"] = by_time["delay"]
+    return stations
+
+def _station_stats_entry(stats: dict, year: list, line: list, delay_code_public_explanation: dict,
+                         delay_code_category: dict, total_num_system_wide_delays_year: int, unit: str) -> dict:
+    """
+    Formats a row of `station_stats_table` for the stats JSON
+    :param stats: row of `station_stats_table` as a dict
+    :param year: years of the stats
+    :param line: lines of the station
+    :param delay_code_public_explanation: mapping of delay code to public friendly explanation
+    :param delay_code_category: mapping of delay code to category
+    :param total_num_system_wide_delays_year: total number of system-wide delays for year
+    :param unit: units for time lost
+    :return: dict containing stats
+    """
+    factor = TIME_UNIT_FACTORS[unit]
+    top_code = stats["top_code_by_count"]
+    top_time_code = stats["top_code_by_time"]
+    percentage_of_delays_orig = (stats["total_delays"] / total_num_system_wide_delays_year) * 100
+    return {
+        "year": year,
+        "line": line,
+        "total_delays": int(stats["total_delays"]),
+        f"time_lost_{unit}": float(round(stats["time_lost"] / factor, 2)),
+        "major_delays": int(stats["major_delays"]),
+        "pct_of_system_delays_originating": float(round(percentage_of_delays_orig, 2)),
+        "top_reason_for_delays (by count)": f"{delay_code_category[top_code]}: {delay_code_public_explanation[top_code]}",
+        "time_lost_due_to_top_delay_by_count": float(round(stats["top_code_by_count_delay"] / factor, 2)),
+        "top_reason_for_delays_by_time":
+            f"{delay_code_category[top_time_code]}: {delay_code_public_explanation[top_time_code]}",
+        "time_lost_due_to_top_delay_by_time": float(round(stats["top_code_by_time_delay"] / factor, 2)),
+    }
+
 def generate_station_stats(df_year_station:pd.DataFrame, station_line_dict:dict, delay_code_public_explanation:dict,
                            delay_code_category:dict, total_num_system_wide_delays_year:int,
                            unit: str = "minutes") ->dict:
@@ -26,78 +125,30 @@ def generate_station_stats(df_year_station:pd.DataFrame, station_line_dict:dict,
     :param unit: units for time lost
     :return: dict containing stats
     """
-    station_stats = {}
-    # Group by year and sum delays
-    if unit not in {"minutes", "hours", "days"}:
+    if unit not in TIME_UNIT_FACTORS:
         raise ValueError("unit must be 'minutes', 'hours', or 'days'")
 
-    # conversation factor
-    factors = {
-        "minutes": 1,
-        "hours": 60,
-        "days": 60 * 24,
-    }
-
-    #
-    delay = (
-        df_year_station.groupby("Code")["Min Delay"]
-        .sum()
-        .reset_index(name="Total Delay")
-        .sort_values("Total Delay", ascending= False)
-    )
-
-
-    # top delay by count
-    top_delay_code = df_year_station["Code"].value_counts().idxmax() # by count
-    top_delay_public_explanation  = delay_code_public_explanation[top_delay_code]
-    top_delay_category = delay_code_category[top_delay_code]
-    time_lost_due_to_delay = delay[delay["Code"]==top_delay_code]["Total Delay"].iloc[0]
-
-
-    # top delay by time lost
-    top_time_delay_code = delay.iloc[0]["Code"]
-    top_time_delay_public_explanation = delay_code_public_explanation[top_time_delay_code]
-    top_time_delay_category = delay_code_category[top_time_delay_code]
-    time_lost_due_to_top_time_delay = delay.iloc[0]["Total Delay"]
-
-
-    # stats
-    total_delays = len(df_year_station)
-    time_lost = (df_year_station["Min Delay"].sum())/factors[unit]
-    number_of_major_delays = len(df_year_station[df_year_station["Min Delay"] >=20])
-    percentage_of_delays_orig = (total_delays/total_num_system_wide_delays_year) * 100
-    top_reason_for_delays_by_count = f"{top_delay_category}: {top_delay_public_explanation}"
-    time_lost_due_to_top_delay_by_count = round(time_lost_due_to_delay/factors[unit],2)
-    top_reason_for_delays_by_time = f"{top_time_delay_category}: {top_time_delay_public_explanation}"
-    time_lost_due_to_top_delay_by_time = round(time_lost_due_to_top_time_delay/factors[unit], 2)
+    stats = station_stats_table(df_year_station).iloc[0]
     year = df_year_station["DateTime"].dt.year.unique().tolist()
-    station = df_year_station["Station"].unique()[0]
-
-    station_stats[station] = {
-        "year": year,
-        "line": station_line_dict[station],
-        "total_delays": int(total_delays),
-        f"time_lost_{unit}": float(round(time_lost, 2)),
-        "major_delays": int(number_of_major_delays),
-        "pct_of_system_delays_originating": float(round(percentage_of_delays_orig, 2)),
-        "top_reason_for_delays (by count)": top_reason_for_delays_by_count,
-        "time_lost_due_to_top_delay_by_count" : float(time_lost_due_to_top_delay_by_count),
-        "top_reason_for_delays_by_time": top_reason_for_delays_by_time,
-        "time_lost_due_to_top_delay_by_time": float(time_lost_due_to_top_delay_by_time)
-    }
+    station = stats.name
 
-    return station_stats
+    return {station: _station_stats_entry(stats.to_dict(), year, station_line_dict[station],
+                                          delay_code_public_explanation, delay_code_category,
+                                          total_num_system_wide_delays_year, unit)}
 
 def generate_all_station_stats(df:pd.DataFrame, year:int, unit:str = "minutes") ->dict:
     """
-    Generates stats for all stations for given years
+    Generates stats for all stations for given years, computed for all stations in one grouped pass
     :param df: pd.DataFrame
     :param year: year
     :param unit: units for time lost
     :return: dict containing stats for all stations
     """
+    if unit not in TIME_UNIT_FACTORS:
+        raise ValueError("unit must be 'minutes', 'hours', or 'days'")
+
     valid_stations_list = read_txt_to_list(VALID_STATIONS_FILE)
-    df_year = df[df["Year"]==year]
+    df_year = select_years(df, year, year)
     total_num_of_system_wide_delays = len(df_year)
 
     # station: line mapping
@@ -107,12 +158,16 @@ def generate_all_station_stats(df:pd.DataFrame, year:int, unit:str = "minutes")
     # delay code: category dict
     delay_code_category = delay_code_category_dict()
 
+    # stats of all stations at once
+    stats_by_station = station_stats_table(df_year).to_dict("index")
+
     stations_stats_list = []
     for station in valid_stations_list:
-        df_station = df_year[df_year["Station"] == station.upper()]
-        station_stats = generate_station_stats(df_station, station_line_dict, delay_code_public_explanation,
-                                               delay_code_category, total_num_of_system_wide_delays, unit)
-        stations_stats_list.append(station_stats)
+        station = station.upper()
+        station_stats = _station_stats_entry(stats_by_station[station], [int(year)], station_line_dict[station],
+                                             delay_code_public_explanation, delay_code_category,
+                                             total_num_of_system_wide_delays, unit)
+        stations_stats_list.append({station: station_stats})
 
     return {"stations_stats": stations_stats_list}
 
@@ -138,16 +193,14 @@ def code_specific_station_stats(df: pd.DataFrame, year_start:int, year_end:int,
         raise ValueError(f"DateTime column not found. Available columns: {df.columns.tolist()}")
 
     code_stats = {}
-    df = df.copy()
+
+    # filter, selecting the years by binary search on the DateTime-sorted data
+    df = select_years(df, year_start, year_end)
+    df = df[df["Code"].isin(code)].copy()
 
     # Create Year column
     df["Year"] = df["DateTime"].dt.year
 
-    # filter
-    years = range(year_start, year_end + 1)
-    df = df[df["Year"].isin(years)]
-    df = df[df["Code"].isin(code)]
-
     # conversion factor
     factors = {
         "minutes": 1,
@@ -157,7 +210,7 @@ def code_specific_station_stats(df: pd.DataFrame, year_start:int, year_end:int,
 
     # create dataframe with avg delay per incident per station
     time_severity = (
-        df.groupby(["Station"])["Min Delay"]
+        df.groupby(["Station"], observed=True)["Min Delay"]
         .mean()
         .reset_index(name="Avg Delay per Incident")
     )
@@ -167,13 +220,13 @@ def code_specific_station_stats(df: pd.DataFrame, year_start:int, year_end:int,
 
     # create dataframe with number of counts of delay per station by year
     delay_stations = (
-        df.groupby(["Year", "Station"])
+        df.groupby(["Year", "Station"], observed=True)
         .size()
         .reset_index(name="Count")
     )
 
     # get the avg count per year
-    count_severity = delay_stations.groupby(["Station"])["Count"].sum().reset_index(name="Total Count")
+    count_severity = delay_stations.groupby(["Station"], observed=True)["Count"].sum().reset_index(name="Total Count")
     total_num_of_mths = num_of_mths(df) # dataframe might not be complete as the latest year may not be over
     count_severity["Avg Count per Year"] = ((count_severity["Total Count"] / total_num_of_mths) * 12).round(1)
 
@@ -1,4 +1,8 @@
-from utils import load_utils, clean_utils, log_utils, file_utils
+import pandas as pd
+
+from utils import load_utils, clean_utils, log_utils, file_utils, manifest_utils, schema
+from utils.profile_utils import StageProfiler
+from utils.ttc_loader import TTCLoader
 from config import LOG_DIR, INTERIM_DATA_DIR, PROCESSED_DELAY_DIR
 
 """
@@ -9,7 +13,12 @@ This script performs the following:
 - Removes invalid records (e.g., NaNs, zero-minute delays, missing vehicle numbers)
 - Cleans and standardizes key fields (e.g., station names, delay codes, bounds)
 - Adds helper columns such as station category and `is_weekend`
-- Saves the cleaned DataFrame to the processed data directory
+- Saves the cleaned DataFrame to the processed data directory as a year-partitioned Parquet dataset
+
+In incremental mode only raw workbooks that changed since the most recently processed dataset are read, and only
+their rows at or after its latest DateTime are cleaned; they are de-duplicated against the processed rows at the
+boundary and appended to them. Only the year partitions receiving new rows are rewritten, the other years are
+carried over from the previous dataset.
 
 For manual verification purposes, the script also logs:
 - Names of raw delay data files merged, along with any errors during merging (e.g., missing or extra columns)
@@ -20,91 +29,189 @@ For manual verification purposes, the script also logs:
 merged_file_name = "merged_unfiltered"
 clean_file_name = "cleaned_delay_data"
 
-def clean_dataframe():
+def clean_rows(df: pd.DataFrame, profiler: StageProfiler | None = None) -> pd.DataFrame:
     """
-    Cleans and saves DataFrame to disk.
-    :return:pd.DataFrame: cleaned DataFrame
+    Runs the cleaning stages on merged raw delay rows.
+    :param df: pd.DataFrame of merged raw delay rows
+    :param profiler: optional StageProfiler recording each stage
+    :return: pd.DataFrame of cleaned rows
     """
-
-    # Load raw delay data (dict: filename: list of DataFrames)
-    dfs_by_file = load_utils.load_raw_data_files()
-
-    # merge the dataframes
-    df_merged = clean_utils.merge_delay_data(dfs_by_file)
-
-    # save to interim folder
-    merged_file_path = file_utils.write_to_csv(df_merged, merged_file_name, INTERIM_DATA_DIR, True)
-
-    # load merged unfiltered data
-    df = file_utils.read_csv(merged_file_path)
+    profiler = profiler or StageProfiler(enabled=False)
 
     # drop nan data and data with no delay, no gap, delay < time gap between trains or no vehicle number
-    df = clean_utils.drop_invalid_rows(df)
+    df = profiler.run("drop_invalid_rows", clean_utils.drop_invalid_rows, df)
 
     # drop duplicate rows
-    df = clean_utils.drop_duplicates(df)
+    df = profiler.run("drop_duplicates", clean_utils.drop_duplicates, df)
 
     # standardize station names
-    df = clean_utils.clean_station_column(df)
+    df = profiler.run("clean_station_column", clean_utils.clean_station_column, df)
 
     # rename stations according to latest name, e.g. Dundas -> TMU
-    df = clean_utils.name_change(df)
+    df = profiler.run("name_change", clean_utils.name_change, df)
 
     # categorize stations into passenger, non-passenger and unknown
-    df = clean_utils.add_station_category(df)
+    df = profiler.run("add_station_category", clean_utils.add_station_category, df)
 
     # log unique stations by category
-    log_utils.log_unique_stations_by_category(df, LOG_DIR)
+    profiler.run("log_unique_stations_by_category", log_utils.log_unique_stations_by_category, df, LOG_DIR)
 
     # drop stations that are SRT stations or have severe spelling errors, or have directionals in the name
-    df = clean_utils.drop_unknown_stations(df)
+    df = profiler.run("drop_unknown_stations", clean_utils.drop_unknown_stations, df)
 
     # drop stations that are non-passenger stations, e.g Yards, Hostler, Track etc
-    df = clean_utils.drop_non_passenger_stations(df)
+    df = profiler.run("drop_non_passenger_stations", clean_utils.drop_non_passenger_stations, df)
 
-    # cleans delay code
-    df = clean_utils.clean_delay_code_column(df)
+    # set invalid delay codes to nan, saving their rows to disk
+    df = profiler.run("validate_delay_codes", clean_utils.validate_delay_codes, df)
 
     # clean linecode
-    df = clean_utils.clean_linecode_column(df)
+    df = profiler.run("clean_linecode_column", clean_utils.clean_linecode_column, df)
 
     # clean bound
-    df = clean_utils.clean_bound_column(df)
+    df = profiler.run("clean_bound_column", clean_utils.clean_bound_column, df)
 
     # add datetime column
-    df = clean_utils.clean_and_add_datetime(df)
+    df = profiler.run("clean_and_add_datetime", clean_utils.clean_and_add_datetime, df)
 
     # remove any rows where Date, Time, or DateTime have missing values after parsing
-    df = df.dropna()
+    df = profiler.run("dropna_after_datetime", pd.DataFrame.dropna, df)
+
+    # fix day, add IsWeekday, rush hour and season columns
+    df = profiler.run("add_time_features", clean_utils.add_time_features, df)
 
-    # clean day
-    df = clean_utils.clean_day(df)
+    # add delay category, e.g Mechanical/Infrastructure, and delay descriptions
+    df = profiler.run("enrich_delay_codes", clean_utils.enrich_delay_codes, df)
 
-    # add IsWeekday column
-    df = clean_utils.add_isweekday(df)
+    # remove any invalid rows after cleaning data
+    df = profiler.run("dropna_after_delay_codes", pd.DataFrame.dropna, df)
+
+    return df
 
-    # add rush hour column
-    df = clean_utils.add_rush_hour(df)
+def load_latest_processed(years: list[int] | None = None) -> pd.DataFrame | None:
+    """
+    Loads the most recently processed delay data.
+    :param years: years to load. None loads all years
+    :return: pd.DataFrame, or None if nothing has been processed yet
+    """
+    try:
+        return TTCLoader(years=years).df
+    except FileNotFoundError:
+        return None
 
-    # add season column
-    df = clean_utils.add_season(df)
+def clean_dataframe(incremental: bool = False, checkpoint: bool = False, profile: bool = False,
+                    parallel: bool = True):
+    """
+    Cleans and saves DataFrame to disk.
+    :param incremental: If True, only clean raw rows of changed workbooks newer than the latest processed data and
+    append them to it. Falls back to a full rebuild when there is no processed data yet.
+    :param checkpoint: If True, snapshot the merged data to the interim folder as Parquet on a background thread.
+    :param profile: If True, record wall time, CPU time, memory and rows in/out per stage and write a JSON report
+    and trace next to the logs.
+    :param parallel: If True, parse raw workbooks concurrently in a process pool (one after the other on a
+    single-CPU machine).
+    :return:pd.DataFrame: cleaned DataFrame
+    """
+    # the profiler stops its memory tracing however the run ends
+    with StageProfiler(enabled=profile) as profiler:
+        try:
+            df = _clean_and_save(profiler, incremental, checkpoint, parallel)
+        finally:
+            # make sure the interim snapshot is on disk before returning, also when there was nothing new to clean
+            profiler.run("wait_for_background_writes", file_utils.wait_for_background_writes)
+
+        if profile:
+            report_paths = profiler.write_report("preprocess_profile", LOG_DIR)
+            print(f"Wrote stage profile to {', '.join(report_paths)}")
 
-    # add delay category, e.g Mechanical/Infrastructure
-    df = clean_utils.add_delay_category(df)
+    return df
 
-    # add delay descriptions
-    df = clean_utils.add_delay_description(df)
+def _clean_and_save(profiler: StageProfiler, incremental: bool, checkpoint: bool, parallel: bool) -> pd.DataFrame:
+    """
+    Loads, cleans and saves the delay data, see `clean_dataframe`.
+    :param profiler: StageProfiler recording each stage
+    :param incremental: If True, only clean raw rows newer than the latest processed data
+    :param checkpoint: If True, snapshot the merged data to the interim folder
+    :param parallel: If True, parse raw workbooks concurrently
+    :return: pd.DataFrame: cleaned DataFrame
+    """
+    # the latest processed dataset, which an incremental run extends
+    previous = manifest_utils.resolve_dataset(PROCESSED_DELAY_DIR) if incremental else None
+    if previous is not None and previous["max_datetime"] is None:
+        previous = None
+    if incremental and previous is None:
+        print(f"No processed data found in {PROCESSED_DELAY_DIR}, cleaning all rows")
 
-    # remove any invalid rows after cleaning data
-    df = df.dropna()
+    # raw workbooks the dataset is built from; an incremental run skips those already processed
+    sources = profiler.run("raw_file_hashes", load_utils.raw_file_hashes)
+    skip_hashes = previous.get("sources", {}).values() if previous is not None else None
 
-    # sort dataframe by datetime
-    df = clean_utils.sort_by_datetime(df)
+    # Load raw delay data (dict: filename: list of DataFrames)
+    dfs_by_file = profiler.run("load_raw_data_files", load_utils.load_raw_data_files, parallel=parallel,
+                               skip_hashes=skip_hashes)
 
-    # write out cleaned csv
-    file_utils.write_to_csv(df, clean_file_name, PROCESSED_DELAY_DIR, True)
+    # merge the dataframes
+    df_merged = profiler.run("merge_delay_data", clean_utils.merge_delay_data, dfs_by_file)
+
+    df_processed = None
+    if previous is not None:
+        # keep raw rows at or after the latest processed DateTime
+        watermark = pd.Timestamp(previous["max_datetime"])
+        if not df_merged.empty:
+            df_merged = profiler.run("select_new_rows", clean_utils.select_new_rows, df_merged, watermark)
+        print(f"Incremental run: {len(df_merged)} raw rows at or after {watermark}")
+        if df_merged.empty:
+            print("No new rows to clean")
+            return load_latest_processed()
+        # new rows only fall in the year of the watermark or later, the earlier years are carried over as they are
+        df_processed = profiler.run("load_latest_processed", load_latest_processed, [watermark.year])
+
+    # normalize dtypes in memory (dates and times as strings, missing markers as NaN, numeric text as numbers)
+    df = profiler.run("normalize_dtypes", clean_utils.normalize_dtypes, df_merged)
+
+    if checkpoint:
+        # snapshot to interim folder; the shallow copy keeps later column assignments out of the snapshot
+        file_utils.write_in_background(file_utils.write_to_parquet, df.copy(deep=False), merged_file_name,
+                                       INTERIM_DATA_DIR, True)
+
+    # run the cleaning stages
+    df = clean_rows(df, profiler)
+
+    if df_processed is not None:
+        # append new rows, dropping rows already processed at the watermark
+        df = profiler.run("append_new_rows", clean_utils.append_new_rows, df_processed, df)
 
-    print(f"Cleaned and saved dataframe {clean_file_name} in {PROCESSED_DELAY_DIR}")
+    # sort dataframe by datetime
+    df = profiler.run("sort_by_datetime", clean_utils.sort_by_datetime, df)
+
+    # conform to the delay data schema (categoricals, small integers) for the columnar store
+    df_typed = profiler.run("apply_schema", schema.apply_schema, df)
+    memory_report = schema.memory_report(df, df_typed)
+    log_utils.write_log(memory_report.to_string().splitlines(), "processed_memory_report", LOG_DIR)
+    print(f"Processed data in memory: {memory_report.loc['Total', 'mb_before']:.1f} MB -> "
+          f"{memory_report.loc['Total', 'mb_after']:.1f} MB with the delay data schema")
+    df = df_typed
+
+    # years of the previous dataset without new rows are linked into the new dataset instead of rewritten
+    unchanged_partitions = {}
+    if previous is not None:
+        years = set(df["DateTime"].dt.year)
+        unchanged_partitions = {year: path for year, path in
+                                file_utils.parquet_dataset_partitions(previous["path"]).items() if year not in years}
+
+    # write out cleaned dataset, one Parquet file per year
+    dataset_path = profiler.run("write_partitioned_parquet", file_utils.write_partitioned_parquet, df,
+                                df["DateTime"].dt.year, clean_file_name, PROCESSED_DELAY_DIR, True,
+                                unchanged_partitions)
+    if unchanged_partitions:
+        # the whole dataset, for the manifest and the caller
+        df = profiler.run("read_parquet_dataset", file_utils.read_parquet_dataset, dataset_path)
+
+    # record the dataset in the manifest as the latest version
+    dataset = profiler.run("record_dataset", manifest_utils.record_dataset, dataset_path, df, PROCESSED_DELAY_DIR,
+                           sources)
+
+    print(f"Cleaned and saved dataframe {clean_file_name} in {PROCESSED_DELAY_DIR} (dataset id {dataset['id']})")
 
     return df
 
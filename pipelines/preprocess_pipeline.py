@@ -9,12 +9,14 @@ Steps:
 - Merges and cleans raw TTC subway delay data (standardizes fields, removes invalid records, adds helper columns)
 - Logs key processing steps for manual verification
 
-Run this script to generate a cleaned TTC subway delay dataset.
+Run this script to generate a cleaned TTC subway delay dataset. Pass `incremental=True` to `preprocess_pipeline` to only
+clean rows newer than the latest processed dataset and append them to it, and `profile=True` to write a per-stage
+time and memory report next to the logs.
 """
 
-def preprocess_pipeline():
+def preprocess_pipeline(incremental: bool = False, profile: bool = False):
     clean_delay_codes()
-    clean_dataframe()
+    clean_dataframe(incremental, profile=profile)
 
 
 if __name__ =="__main__":
@@ -9,7 +9,8 @@ import pandas as pd
 
 from config import (RAW_CODE_DESC_DIR, VALID_STATIONS_W_LINECODES_FILE, CODE_DESCRIPTIONS_FILE, LOG_DIR,
                     REFERENCE_COLS_ORDERED, DROPPED_RAW_DATA_DIR, WEEKDAY_RUSH_HOUR_DICT, SEASONS_TO_MONTHS_DICT,
-                    VALID_LINECODES_TO_BOUND_DICT, PROCESSED_CODE_DESCRIPTIONS_FILE, NAME_CHANGES)
+                    VALID_LINECODES_TO_BOUND_DICT, PROCESSED_CODE_DESCRIPTIONS_FILE, NAME_CHANGES,
+                    DUPLICATE_KEY_COLS)
 from utils import log_utils, file_utils
 
 
@@ -93,6 +94,77 @@ def merge_delay_data(file_to_sheets:dict[str, list], log_dir=LOG_DIR,
 
     return combined_df
 
+# Text read back as NaN by pd.read_csv
+CSV_NA_VALUES = frozenset({'', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                           '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'})
+
+def normalize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normalizes the dtypes of merged raw delay data in memory, giving the same frame as writing it to CSV and
+    reading it back:
+    - datetime columns become 'YYYY-MM-DD' strings ('YYYY-MM-DD HH:MM:SS' if any value has a time of day)
+    - non-string values in text columns (e.g. datetime.time cells) become strings
+    - text matching a CSV missing-value marker (e.g. '', 'NA', 'null') becomes NaN
+    - text columns holding only numbers become numeric
+    :param df: merged pd.DataFrame
+    :return: pd.DataFrame with normalized dtypes
+    """
+    df = df.copy()
+    for col in df.columns:
+        values = df[col]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            has_time = (values.dropna() != values.dropna().dt.normalize()).any()
+            df[col] = values.dt.strftime('%Y-%m-%d %H:%M:%S' if has_time else '%Y-%m-%d')
+
+        elif values.dtype == object:
+            text = values.dropna().astype(str)
+            text = text.mask(text.isin(CSV_NA_VALUES)).reindex(values.index)
+            try:
+                # raises on the first non-numeric value, so text columns fail fast
+                df[col] = pd.to_numeric(text)
+            except (ValueError, TypeError):
+                df[col] = text
+    return df
+
+def select_new_rows(df: pd.DataFrame, watermark: pd.Timestamp) -> pd.DataFrame:
+    """
+    Selects raw rows whose parsed Date and Time are at or after the watermark, the latest DateTime already processed.
+    Rows exactly at the watermark are kept so that late additions sharing that timestamp are not lost; rows that were
+    already processed are removed by `append_new_rows`. Rows whose Date or Time cannot be parsed are left out, as the
+    cleaning stages would drop them anyway.
+    :param df: pd.DataFrame of merged raw delay rows
+    :param watermark: latest DateTime in the processed data
+    :return: pd.DataFrame with the selected rows
+    """
+    date_time = clean_time(clean_date(df[['Date', 'Time']].copy()))
+    raw_datetime = pd.to_datetime(date_time['Date'] + ' ' + date_time['Time'], format='%Y-%m-%d %H:%M:%S',
+                                  errors='coerce')
+    return df[raw_datetime >= watermark].reset_index(drop=True)
+
+def append_new_rows(df_processed: pd.DataFrame, df_new: pd.DataFrame,
+                    key_cols: list[str] = DUPLICATE_KEY_COLS) -> pd.DataFrame:
+    """
+    Appends newly cleaned rows to the processed data. New rows that duplicate a processed row are dropped, so
+    duplicate detection still holds across the boundary between the two. Only processed rows at or after the
+    earliest new DateTime are compared.
+    :param df_processed: pd.DataFrame of previously processed delay data
+    :param df_new: pd.DataFrame of newly cleaned delay data
+    :param key_cols: columns identifying a delay record
+    :return: pd.DataFrame with the new rows appended
+    """
+    if df_new.empty:
+        return df_processed
+
+    boundary = df_processed.loc[df_processed['DateTime'] >= df_new['DateTime'].min(), key_cols].drop_duplicates()
+    matched = df_new[key_cols].merge(boundary, on=key_cols, how='left', indicator=True)['_merge'] == 'both'
+    print(f"Rows dropped: {int(matched.sum())} new rows already processed")
+
+    df_new = df_new[~matched.to_numpy()]
+    if df_new.empty:
+        return df_processed
+    # leave out empty frames, pandas deprecates taking their dtypes into account when concatenating
+    return pd.concat([df for df in (df_processed, df_new) if not df.empty], ignore_index=True)
+
 def drop_duplicates(df:pd.DataFrame, dropped_raw_data_dir = DROPPED_RAW_DATA_DIR) -> pd.DataFrame:
     """
     Drops duplicate rows
@@ -114,39 +186,66 @@ def drop_invalid_rows(df: pd.DataFrame, dropped_raw_data_dir: str = DROPPED_RAW_
 
     This ensures only meaningful delay events are kept for analysis.
 
+    All rejection reasons are evaluated as boolean masks in one pass. Each dropped row is labelled with the first
+    reason that applies in a 'Drop Reason' column, and the dropped rows are written to a single Parquet file in the
+    background.
+
     :param df: Raw pd.DataFrame
     :param dropped_raw_data_dir: Directory to store dropped data
     :return: pd.DataFrame with invalid rows removed
     """
 
-    drop_conditions = {}
-
-    # Drop rows with missing values
-    drop_conditions["missing_values"] = df[df.isnull().any(axis=1)]
-    df = df.dropna()
-
-    # Drop rows where delay is zero
-    drop_conditions["zero_min_delay"] = df[df['Min Delay'] == 0]
-    df = df[df['Min Delay'] != 0]
+    drop_conditions = {
+        # rows with missing values
+        "missing_values": df.isnull().any(axis=1),
+        # rows where delay is zero
+        "zero_min_delay": df['Min Delay'] == 0,
+        # rows where gap is zero
+        "zero_gap": df['Min Gap'] == 0,
+        # rows where the delay is more than the time gap between delayed train and the train ahead
+        "delay_more_than_gap": df['Min Delay'] >= df['Min Gap'],
+        # rows where vehicle is zero
+        "zero_vehicle_number": df['Vehicle'] == 0,
+    }
 
-    # Drop rows where gap is zero
-    drop_conditions["zero_gap"] = df[df['Min Gap'] == 0]
-    df = df[df['Min Gap'] != 0]
-
-    # Drop rows where the delay is more than the time gap between delayed train and the train ahead
-    drop_conditions["delay_more_than_gap"] = df[df['Min Delay'] >= df['Min Gap']]
-    df = df[df['Min Delay'] < df['Min Gap']]
-
-    # Drop rows where vehicle is zero
-    drop_conditions["zero_vehicle_number"] = df[df['Vehicle'] == 0]
-    df = df[df['Vehicle'] != 0]
+    reasons = np.select(list(drop_conditions.values()), list(drop_conditions.keys()), default="")
+    is_dropped = reasons != ""
 
     # Write out dropped data
-    for condition, dropped_df in drop_conditions.items():
-        if not dropped_df.empty:
-            file_utils.write_to_csv(df=dropped_df, prefix=condition, output_dir=dropped_raw_data_dir)
-            print(f"Rows dropped: {condition} saved in {dropped_raw_data_dir}")
-    return df
+    if is_dropped.any():
+        dropped_df = df[is_dropped].assign(**{"Drop Reason": reasons[is_dropped]})
+        file_utils.write_in_background(file_utils.write_to_parquet, dropped_df, "invalid_rows", dropped_raw_data_dir)
+        for condition in drop_conditions:
+            count = int((reasons == condition).sum())
+            if count:
+                print(f"Rows dropped: {count} {condition} saved in {dropped_raw_data_dir}")
+    return df[~is_dropped]
+
+# Patterns used by clean_station_name, compiled once
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+_ST_PATTERN = re.compile(r'\bST\b(?=\s)')
+_EMBEDDED_LINECODE_PATTERN = re.compile(r'\b(YU|YUS|BD|BDL|BDN|BD-S|L1|L2|LINE\s?\d+)\b')
+_STATION_ENDING_PATTERN = re.compile(r'( STATIO| STA| STN| STAION)$')
+
+LEGIT_STATION_ENDNAME_KEYWORDS = ['STATION', 'YARD', 'HOSTLER', 'WYE', 'POCKET', 'TAIL', 'TRACK']
+
+# Fixes abbreviations and Dual Named Interchange Stations
+STATION_MAP = {
+    'VMC STATION': 'VAUGHAN METROPOLITAN CENTRE STATION',
+    'VAUGHAN MC STATION': 'VAUGHAN METROPOLITAN CENTRE STATION',
+    'NORTH YORK CTR STATION': 'NORTH YORK CENTRE STATION',
+    'BLOOR STATION': 'BLOOR-YONGE STATION',
+    'BLOOR/YONGE STATION': 'BLOOR-YONGE STATION',
+    'YONGE AND BLOOR STATION': 'BLOOR-YONGE STATION',
+    'YONGE-BLOOR STATION': 'BLOOR-YONGE STATION',
+    'YONGE STATION': 'BLOOR-YONGE STATION',
+    'YONGE-UNIVERSITY AND B': 'BLOOR-YONGE STATION',
+    'SHEPPARDYONGE STATION': 'SHEPPARD-YONGE STATION',
+    'SHEPPARD STATION': 'SHEPPARD-YONGE STATION',
+    "YONGE SHEPPARD" : 'SHEPPARD-YONGE STATION',
+    'YONGE SHEP STATION': 'SHEPPARD-YONGE STATION',
+    'YONGE SHP STATION': 'SHEPPARD-YONGE STATION',
+    'SHEPPARD YONGE STATION': 'SHEPPARD-YONGE STATION'}
 
 def clean_station_name(name:str) -> str:
     """
@@ -161,61 +260,44 @@ def clean_station_name(name:str) -> str:
     """
 
     name = str(name).strip().upper() # strips leading and trailing white spaces, makes everything upper case
-    name = re.sub(r'\s+', ' ', name) # replaces any spaces that are one or more tabs in the name to one
+    name = _WHITESPACE_PATTERN.sub(' ', name) # replaces any spaces that are one or more tabs in the name to one
 
     # Normalize 'St' to 'St.'
-    name = re.sub(r'\bST\b(?=\s)', 'ST.', name)
+    name = _ST_PATTERN.sub('ST.', name)
 
     # Remove embedded line codes (YUS, BD, L1, L2, etc.) from anywhere in the name
-    name = re.sub(r'\b(YU|YUS|BD|BDL|BDN|BD-S|L1|L2|LINE\s?\d+)\b', '', name)
+    name = _EMBEDDED_LINECODE_PATTERN.sub('', name)
 
     # clean up extra whitespace left behind
-    name = re.sub(r'\s+', ' ', name)
+    name = _WHITESPACE_PATTERN.sub(' ', name)
 
 
     # Fix endings like "STATIO", "STA", etc.
     name = name.strip()
-    name = re.sub(r'( STATIO| STA| STN| STAION)$', ' STATION', name)
+    name = _STATION_ENDING_PATTERN.sub(' STATION', name)
 
-    legit_station_endname_keywords = ['STATION', 'YARD', 'HOSTLER', 'WYE', 'POCKET', 'TAIL', 'TRACK']
-    if name.split(' ')[-1] not in legit_station_endname_keywords:
+    if name.split(' ')[-1] not in LEGIT_STATION_ENDNAME_KEYWORDS:
         name += ' STATION'
 
-
-    # Fixes abbreviations and Dual Named Interchange Stations
-    station_map = {
-        'VMC STATION': 'VAUGHAN METROPOLITAN CENTRE STATION',
-        'VAUGHAN MC STATION': 'VAUGHAN METROPOLITAN CENTRE STATION',
-        'NORTH YORK CTR STATION': 'NORTH YORK CENTRE STATION',
-        'BLOOR STATION': 'BLOOR-YONGE STATION',
-        'BLOOR/YONGE STATION': 'BLOOR-YONGE STATION',
-        'YONGE AND BLOOR STATION': 'BLOOR-YONGE STATION',
-        'YONGE-BLOOR STATION': 'BLOOR-YONGE STATION',
-        'YONGE STATION': 'BLOOR-YONGE STATION',
-        'YONGE-UNIVERSITY AND B': 'BLOOR-YONGE STATION',
-        'SHEPPARDYONGE STATION': 'SHEPPARD-YONGE STATION',
-        'SHEPPARD STATION': 'SHEPPARD-YONGE STATION',
-        "YONGE SHEPPARD" : 'SHEPPARD-YONGE STATION',
-        'YONGE SHEP STATION': 'SHEPPARD-YONGE STATION',
-        'YONGE SHP STATION': 'SHEPPARD-YONGE STATION',
-        'SHEPPARD YONGE STATION': 'SHEPPARD-YONGE STATION'}
-
     key = name.strip().upper()
-    if key in station_map:
-        name = station_map[key]
+    if key in STATION_MAP:
+        name = STATION_MAP[key]
 
     # clean up extra whitespace left behind
-    name = re.sub(r'\s+', ' ', name)
+    name = _WHITESPACE_PATTERN.sub(' ', name)
 
     return name
 
 def clean_station_column(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Cleans station names in 'Station' columns by applying `clean_station_name` function
+    Cleans station names in 'Station' columns by applying `clean_station_name` function.
+    Each distinct raw spelling is cleaned once and mapped back to the rows through its factorized codes.
     :param df: pd.Dataframe
     :return pd.Dataframe with cleaned station names
     """
-    df['Station'] = df['Station'].apply(clean_station_name)
+    codes, uniques = pd.factorize(df['Station'], use_na_sentinel=False)
+    cleaned = np.array([clean_station_name(name) for name in uniques], dtype=object)
+    df['Station'] = cleaned[codes]
     return df
 
 def valid_station_linecode_dict() -> dict:
@@ -298,64 +380,71 @@ def drop_non_passenger_stations(df:pd.DataFrame, dropped_raw_data_dir: str = DRO
 
     return df[df["Station Category"] != "Non-passenger"].copy()
 
-def clean_linecode(row:pd.Series, valid_station_linecode:dict) -> str | float:
+def _pair_lookup(left: tuple[np.ndarray, pd.Index], right: tuple[np.ndarray, pd.Index], is_valid_pair) -> np.ndarray:
     """
-    Fixes incorrect linecodes using the valid_station_linecode_dict.
-    :param row: pd.Series
-    :param valid_station_linecode: Dictionary containing operational station names with corresponding linecode
-    :return: linecode or np.nan for ambiguous data
+    Evaluates is_valid_pair(left value, right value) once per distinct (left, right) combination present in the data
+    and maps the result back to every row.
+    :param left: (codes, uniques) from pd.factorize of the left column, with missing values kept as values
+    :param right: (codes, uniques) from pd.factorize of the right column, with missing values kept as values
+    :param is_valid_pair: function taking a left and a right value and returning a bool
+    :return: boolean np.ndarray with one entry per row
     """
+    left_codes, left_uniques = left
+    right_codes, right_uniques = right
 
-    station = row["Station"]
-    line = row["Line"]
+    # one integer per (left, right) combination
+    width = len(right_uniques)
+    pair_codes, pairs = pd.factorize(left_codes * width + right_codes)
 
-    if station not in valid_station_linecode: # a non-passenger station or unknown
-        return line
+    results = np.zeros(len(pairs), dtype=bool)
+    for k, pair in enumerate(pairs):
+        i, j = divmod(pair, width)
+        results[k] = is_valid_pair(left_uniques[i], right_uniques[j])
 
-    # valid linecodes for the station
-    valid_codes = valid_station_linecode[station]
-
-    if line in valid_codes:
-        return line # already the correct code
-
-    if len(valid_codes) > 1: # Too ambiguous to fix. e.g. Bloor-Yonge subway,
-        # if the linecode is not BD or YU, we wouldn't know which is the correct code
-        return np.nan
-
-    else: # fix to the correct code
-        return valid_codes[0]  # Fix to the correct code
+    return results[pair_codes]
 
 def clean_linecode_column(df: pd.DataFrame) -> pd.DataFrame:
-    valid_station_linecode = valid_station_linecode_dict()
-    df["Line"] = df.apply(lambda row: clean_linecode(row, valid_station_linecode), axis = 1)
-    return df
-
-def clean_bound(row:pd.Series, valid_station_linecode:dict) -> str | float:
     """
-    For passenger stations with valid line codes e.g Rosedale: YU, check that Bound matches line's valid directions.
-    Else set to NaN.
-    :param row: row from pd.DataFrame with corrected linecode
-    :param valid_station_linecode: Dictionary containing operational station names with corresponding linecode
-    :return: bound or np.nan
+    Fixes incorrect linecodes of passenger stations using the valid_station_linecode_dict:
+    - keeps the linecode if it is valid for the station, or if the station is a non-passenger station or unknown
+    - fixes it to the station's linecode if the station is on a single line
+    - sets it to NaN if the station is on several lines, e.g. Bloor-Yonge, as the correct code is ambiguous
+    :param df: pd.DataFrame
+    :return: pd.DataFrame with clean linecodes
     """
-    line = row["Line"] # correct line
-    bound = row["Bound"]
+    valid_station_linecode = valid_station_linecode_dict()
+    single_linecode = {station: codes[0] for station, codes in valid_station_linecode.items() if len(codes) == 1}
+
+    stations = pd.factorize(df["Station"], use_na_sentinel=False)
+    lines = pd.factorize(df["Line"], use_na_sentinel=False)
 
-    if row["Station"] in valid_station_linecode  and line in VALID_LINECODES_TO_BOUND_DICT : # passenger station
-        if bound not in VALID_LINECODES_TO_BOUND_DICT[line]:
-            return np.nan # too ambiguous to fix direction
+    keep = _pair_lookup(stations, lines, lambda station, line: station not in valid_station_linecode
+                        or line in valid_station_linecode[station])
 
-    return bound
+    # stations on several lines map to NaN, too ambiguous to fix
+    fixed_linecode = pd.Series(stations[1]).map(single_linecode).to_numpy()[stations[0]]
+    df["Line"] = df["Line"].where(keep, fixed_linecode)
+    return df
 
 def clean_bound_column(df: pd.DataFrame) -> pd.DataFrame:
     """
     For passenger stations with valid line codes e.g Rosedale: YU, check that Bound matches line's valid directions.
-    :param df: pd.DataFrame
+    Else set to NaN, as the direction is too ambiguous to fix.
+    :param df: pd.DataFrame with corrected linecodes
     :return: pd.DataFrame with clean bound names
     """
     valid_station_linecode = valid_station_linecode_dict() # e.g {"Rosedale: "YU"}
-    df["Bound"] = df.apply(lambda row: clean_bound(row, valid_station_linecode), axis = 1)
 
+    stations = pd.factorize(df["Station"], use_na_sentinel=False)
+    lines = pd.factorize(df["Line"], use_na_sentinel=False)
+    bounds = pd.factorize(df["Bound"], use_na_sentinel=False)
+
+    to_check = _pair_lookup(stations, lines, lambda station, line: station in valid_station_linecode
+                            and line in VALID_LINECODES_TO_BOUND_DICT)
+    is_valid = _pair_lookup(lines, bounds, lambda line, bound: line in VALID_LINECODES_TO_BOUND_DICT
+                            and bound in VALID_LINECODES_TO_BOUND_DICT[line])
+
+    df["Bound"] = df["Bound"].mask(to_check & ~is_valid)
     return df
 
 def clean_and_add_datetime(df: pd.DataFrame):
@@ -432,92 +521,65 @@ def clean_time(df: pd.DataFrame):
 
     return df
 
-def clean_day(df: pd.DataFrame):
-    """
-     Extracts the day of the week from the 'Date' column and stores it in a 'Day' column. This will fix any errors
-     in the 'Day' column.
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
 
-    :param df: pandas DataFrame with a 'Date' column as datetime.date
-    :return: pandas DataFrame with updated 'Day' column
+def _categorical_from_labels(labels: np.ndarray, codes: np.ndarray) -> pd.Categorical:
     """
-    df['Day'] = df['DateTime'].dt.day_name()
-    return df
-
-def add_isweekday(df: pd.DataFrame) -> pd.DataFrame:
+    Builds a categorical from per-row codes into an array of labels. Categories are sorted so that grouping by the
+    column orders the groups as it would for plain strings.
+    :param labels: np.ndarray of labels, possibly repeated
+    :param codes: np.ndarray of per-row positions into labels
+    :return: pd.Categorical
     """
-    Adds a new column 'IsWeekday' to indicate whether each date falls on a weekday.
+    categories = np.array(sorted(set(labels)), dtype=object)
+    label_to_category = np.searchsorted(categories, labels)
+    return pd.Categorical.from_codes(label_to_category[codes], categories=categories)
 
-    :param df: pd.Dataframe with Datetime column
-    :return: pd.Dataframe with added 'IsWeekday' column
+def add_time_features(df: pd.DataFrame, weekday_rush_hour: dict = WEEKDAY_RUSH_HOUR_DICT,
+                      seasons: Dict[str, List[int]] = SEASONS_TO_MONTHS_DICT) -> pd.DataFrame:
     """
-    df['IsWeekday'] = df['DateTime'].dt.weekday < 5  # True for weekdays, False for weekends
-    return df
+    Derives the calendar features from the 'DateTime' column in one vectorized pass:
+    - 'Day': day of the week, fixing any errors in the raw 'Day' column
+    - 'IsWeekday': True for weekdays, False for weekends
+    - 'Rush Hour': 'Morning', 'Off-peak: Afternoon', 'Evening' or 'Off-peak: Night' on weekdays, 'Weekend' otherwise
+    - 'Season': season of the month, e.g. 'Winter'
 
-def categorize_rush_hour(row:  pd.Series, weekday_rush_hour:dict= WEEKDAY_RUSH_HOUR_DICT) -> str:
-    """
-    Categorizes rush hour into morning, afternoon, offpeak or weekend
+    Rush hours are found by binning the minute of the day against the start/end times in weekday_rush_hour, and
+    seasons by a 12-entry month lookup table. 'Day', 'Rush Hour' and 'Season' are categorical.
 
-    :param row: row from pd.DataFrame
+    :param df: pd.DataFrame with 'DateTime' column
     :param weekday_rush_hour: Dictionary with keys for start/end times of rush hours.
-    :return: Rush hour category
-    """
-
-    if row['IsWeekday']:
-        t = row['DateTime'].time()
-        # Morning peak: 6am - 9am
-        if  weekday_rush_hour["morning start"]  <= t < weekday_rush_hour["morning end"]:
-            return "Morning"
-
-        # Midday off-peak: 9am - 3pm
-        elif weekday_rush_hour["morning end"]  <= t < weekday_rush_hour["evening start"]:
-            return "Off-peak: Afternoon"
-
-        # Evening peak: 3pm - 7pm
-        elif weekday_rush_hour["evening start"]  <= t < weekday_rush_hour["evening end"]:
-            return "Evening"
-
-        # Night off-peak, 7pm onwards
-        else:
-            return "Off-peak: Night"
-
-    else:
-        return "Weekend"
-
-def add_rush_hour(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Adds a 'Rush Hour' column to the DataFrame, categorizing each row as
-    'morning', 'evening', 'off peak', or 'weekend' based on the time and day.
-
-    :param df: pd.DataFrame
-    :return: df: pd.DataFrame with an added 'Rush Hour' column
-    """
-    df['Rush Hour'] =  df.apply(categorize_rush_hour, axis =1)
-    return df
-
-def get_season(dt: pd.Timestamp, seasons: Dict[str, List[int]] = SEASONS_TO_MONTHS_DICT) -> str:
-    """
-    Determines season for a given timestamp
-    :param dt: DateTime row
     :param seasons: Dictionary mapping season names to lists of month numbers
-    :return: season
-    """
-    month = dt.month
+    :return: pd.DataFrame with updated 'Day' column and added 'IsWeekday', 'Rush Hour' and 'Season' columns
+    """
+    weekday = df['DateTime'].dt.weekday.to_numpy()
+    minute_of_day = (df['DateTime'].dt.hour * 60 + df['DateTime'].dt.minute).to_numpy()
+    month = df['DateTime'].dt.month.to_numpy()
+    is_weekday = weekday < 5
+
+    df['Day'] = _categorical_from_labels(np.array(DAY_NAMES, dtype=object), weekday)
+    df['IsWeekday'] = is_weekday
+
+    # minutes since midnight at which each rush hour window starts or ends
+    edges = {key: t.hour * 60 + t.minute for key, t in weekday_rush_hour.items()}
+    rush_hour_labels = np.array(["Off-peak: Night", "Morning", "Off-peak: Afternoon", "Evening", "Weekend"],
+                                dtype=object)
+    rush_hour = np.select(
+        [~is_weekday,
+         (edges["morning start"] <= minute_of_day) & (minute_of_day < edges["morning end"]),  # 6am - 9am
+         (edges["morning end"] <= minute_of_day) & (minute_of_day < edges["evening start"]),  # 9am - 3pm
+         (edges["evening start"] <= minute_of_day) & (minute_of_day < edges["evening end"])], # 3pm - 7pm
+        [4, 1, 2, 3],
+        default=0) # 7pm onwards
+    df['Rush Hour'] = _categorical_from_labels(rush_hour_labels, rush_hour)
+
+    season_by_month = np.full(12, "Unknown", dtype=object) # January at position 0
     for season, months in seasons.items():
-        if month in months:
-            return season
-
-    return "Unknown"
+        season_by_month[np.array(months) - 1] = season
+    df['Season'] = _categorical_from_labels(season_by_month, month - 1)
 
-def add_season(df:pd.DataFrame) -> pd.DataFrame:
-    """
-    Adds "Season" column
-    :param df: pd.DataFrame with "DateTime" column
-    :return: pd.DataFrame with added "Season" column
-    """
-    df["Season"] = df["DateTime"].apply(get_season)
     return df
 
-
 def clean_delay_code_descriptions():
     """
     Loads a CSV file containing raw TTC delay code descriptions, removes all non-ASCII characters
@@ -548,65 +610,15 @@ def delay_code_descriptions_dict() -> dict:
     return df.set_index("CODE")["DESCRIPTION"].to_dict()
 
 
-def clean_delay_code(row:pd.Series, delay_code_descriptions: dict, error_rows:list) -> str|float:
-    """
-    Cleans delay code by checking if it exists in the provided descriptions dictionary.
-    If the delay code is not present in the dictionary, returns NaN.
-    Logs rows with errors in delay code
-    :param row: row of pd.Dataframe
-    :param delay_code_descriptions: Dictionary mapping delay codes to their descriptions
-    :param error_rows: list of rows containing delay code errors
-    :return: correct delay code, or np.nan if not valid.
-    """
-    delay_code = row['Code']
-    if delay_code not in delay_code_descriptions:
-        error_rows.append(row.to_dict())
-        return np.nan
-    return delay_code
-
-def clean_delay_code_column(df:pd.DataFrame) -> pd.DataFrame:
-    """
-    Cleans the 'Code' column in a DataFrame by setting invalid delay codes to nan and
-    logs rows with errors in delay code and saves error data to disk.
-    :param df: pd.DataFrame
-    :return: pd.DataFrame with cleaned 'Code' column
-    """
-    delay_code_descriptions = delay_code_descriptions_dict()
-    error_rows = []
-    # Sets errors to nan
-    df['Code'] =\
-        df.apply(lambda row: clean_delay_code(row, delay_code_descriptions, error_rows), axis = 1)
-    # Save rows with errors to disk
-    df_code_error = pd.DataFrame(error_rows)
-    file_utils.write_to_csv(df_code_error, "delay_data_w_delay_code_error", DROPPED_RAW_DATA_DIR)
-    return df
-
-def delay_description(delay_code:str, delay_code_descriptions: dict) -> str:
-    """
-    Provide the description of the delay, e.g disorderly patron
-    :param delay_code: code of the delay
-    :param delay_code_descriptions: Dictionary mapping delay codes to their descriptions
-    :return: code description
-    """
-    return delay_code_descriptions[delay_code]
-
-def add_delay_description(df:pd.DataFrame) -> pd.DataFrame:
-    """
-    Add 'Delay Description' column to pd.DataFrame
-    :param df: pd.DataFrame
-    :return: pd.DataFrame with 'Delay Description' column
+def sort_by_datetime(df:pd.DataFrame, key_cols: list[str] = DUPLICATE_KEY_COLS) -> pd.DataFrame:
     """
-    delay_code_description = delay_code_descriptions_dict()
-    df['Delay Description'] = df['Code'].apply(lambda code: delay_description(code, delay_code_description))
-    return df
-
-def sort_by_datetime(df:pd.DataFrame) -> pd.DataFrame:
-    """
-    Sort pd.DataFrame by DateTime
+    Sort pd.DataFrame by DateTime, breaking ties by the other key columns with a stable sort, so the same rows
+    always come out in the same order whether they were cleaned in a full or an incremental run
     :param df: pd.DataFrame containing DateTime column
+    :param key_cols: columns identifying a delay record, starting with DateTime
     :return: pd.DataFrame sorted by DateTime
     """
-    return df.sort_values(by='DateTime')
+    return df.sort_values(by=key_cols, kind='stable')
 
 def delay_code_category_dict() -> dict:
     """
@@ -615,34 +627,42 @@ def delay_code_category_dict() -> dict:
     df = file_utils.read_csv(PROCESSED_CODE_DESCRIPTIONS_FILE)
     return dict(zip(df["CODE"], df["CATEGORY"]))
 
-def delay_category(row:pd.Series, delay_code_category: dict, error_rows:list) -> str|float:
+def validate_delay_codes(df: pd.DataFrame, dropped_raw_data_dir: str = DROPPED_RAW_DATA_DIR) -> pd.DataFrame:
     """
-    Gets the category for the delay code
-    :param row: row of pd.DataFame
-    :param delay_code_category: dictionary mapping delay code to category e.g Mechanical/Infrastructure
-    :param error_rows: list of rows containing delay code errors
-    :return category of delay code or np.nan
+    Sets delay codes missing from the delay code descriptions to NaN and saves the rows with those codes to disk.
+    :param df: pd.DataFrame
+    :param dropped_raw_data_dir: Directory to store dropped data
+    :return: pd.DataFrame with cleaned 'Code' column
     """
-    delay_code = row["Code"]
-    if delay_code not in delay_code_category:
-        error_rows.append(row.to_dict())
-        return np.nan
-    return delay_code_category[delay_code]
+    valid_code = df['Code'].isin(delay_code_descriptions_dict().keys())
 
-def add_delay_category(df:pd.DataFrame) -> pd.DataFrame:
+    # Save rows with errors to disk
+    file_utils.write_to_csv(df[~valid_code], "delay_data_w_delay_code_error", dropped_raw_data_dir)
+
+    # Sets errors to nan
+    df['Code'] = df['Code'].where(valid_code)
+    return df
+
+def enrich_delay_codes(df: pd.DataFrame, dropped_raw_data_dir: str = DROPPED_RAW_DATA_DIR) -> pd.DataFrame:
     """
-    Adds delay category column to pd.DataFrame
-    :param df:  pd.DataFrame
-    :return: pd.DataFrame with delay category column
+    Adds the category and description of the delay codes, validated by `validate_delay_codes`, in one pass:
+    - adds 'Delay Category', e.g Mechanical/Infrastructure, and saves rows with a code but no category to disk
+    - adds 'Delay Description', e.g disorderly patron
+    Drops rows left with missing values.
+    :param df: pd.DataFrame
+    :param dropped_raw_data_dir: Directory to store dropped data
+    :return: pd.DataFrame with 'Delay Category' and 'Delay Description' columns
     """
     delay_code_category = delay_code_category_dict()
-    error_rows = []
-    df['Delay Category'] = df.apply(lambda row: delay_category(row, delay_code_category, error_rows), axis = 1)
+
     # Save rows with errors to disk
-    df_code_error = pd.DataFrame(error_rows)
-    file_utils.write_to_csv(df_code_error, "delay_data_w_delay_category_error", DROPPED_RAW_DATA_DIR)
-    df = df.dropna()
-    return df
+    file_utils.write_to_csv(df[~df['Code'].isin(delay_code_category.keys())], "delay_data_w_delay_category_error",
+                            dropped_raw_data_dir)
+
+    df['Delay Category'] = df['Code'].map(delay_code_category)
+    df['Delay Description'] = df['Code'].map(delay_code_descriptions_dict())
+
+    return df.dropna()
 
 def name_change(df: pd.DataFrame) -> pd.DataFrame   :
     """
@@ -1,8 +1,12 @@
+import hashlib
 import os
+import shutil
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 import json
 
 import pandas as pd
+from pandas.api.types import union_categoricals
 
 """
 Utility functions for writing and saving various data outputs (e.g CSV) during TTC delay data preprocessing.
@@ -28,6 +32,139 @@ def write_to_csv(df:pd.DataFrame, prefix: str, output_dir:str, timestamped = Tru
     df.to_csv(path, index=False)
     return path
 
+def write_to_parquet(df:pd.DataFrame, prefix: str, output_dir:str, timestamped = True) -> str:
+    """
+    Saves a DataFrame to a Parquet file in a dated folder, named like `write_to_csv` outputs.
+
+    :param df: The DataFrame to save.
+    :param prefix: The prefix for the filename
+    :param output_dir: The directory where the file will be saved.
+    :param timestamped: If True, append a timestamp to the filename
+    :return: The full path to the saved Parquet file.
+    """
+    date_str = datetime.now().strftime('%Y-%m-%d')
+    date_folder = os.path.join(output_dir, date_str)
+    os.makedirs(date_folder, exist_ok=True)  # Create folder if it doesn't exist
+
+    if timestamped:
+        timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+        path = os.path.join(date_folder, f'{prefix}_{timestamp}.parquet')
+    else:
+        path = os.path.join(date_folder, f'{prefix}.parquet')
+    df.to_parquet(path, index=False)
+    return path
+
+# Single background thread so snapshot writes never compete with each other for disk
+_background_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="background_writer")
+_pending_writes: list[Future] = []
+
+def write_in_background(write_func, *args, **kwargs) -> Future:
+    """
+    Runs a write function (e.g. write_to_parquet) on a background thread.
+    The DataFrame passed in must not be modified in place until the write has finished.
+
+    :param write_func: Function performing the write
+    :return: Future holding the written path
+    """
+    future = _background_writer.submit(write_func, *args, **kwargs)
+    _pending_writes.append(future)
+    return future
+
+def wait_for_background_writes() -> list[str]:
+    """
+    Blocks until all background writes have finished, re-raising the first write error.
+
+    :return: Paths written in the background
+    """
+    paths = []
+    while _pending_writes:
+        paths.append(_pending_writes.pop(0).result())
+    return paths
+
+def write_partitioned_parquet(df:pd.DataFrame, partition_by: pd.Series, prefix: str, output_dir:str,
+                              timestamped = True, unchanged_partitions: dict | None = None) -> str:
+    """
+    Saves a DataFrame as a folder of Parquet files, one per partition key (e.g. <year>.parquet), in a dated folder
+    named like `write_to_csv` outputs. The folder is written under a temporary name and renamed when complete, so
+    readers never see a partially written dataset. Each partition only stores the categories its rows use, so a
+    partition file depends only on its rows and the same rows give the same file however the dataset was built.
+
+    :param df: The DataFrame to save.
+    :param partition_by: Series aligned with df holding the partition key of each row, e.g. the year
+    :param prefix: The prefix for the folder name
+    :param output_dir: The directory where the dataset folder will be saved.
+    :param timestamped: If True, append a timestamp to the folder name
+    :param unchanged_partitions: dict of partition key to Parquet file of an earlier dataset to carry over as is,
+    e.g. the years an incremental run did not touch. They are hard-linked (copied where linking is not possible).
+    :return: The full path to the saved dataset folder.
+    """
+    date_str = datetime.now().strftime('%Y-%m-%d')
+    date_folder = os.path.join(output_dir, date_str)
+    os.makedirs(date_folder, exist_ok=True)  # Create folder if it doesn't exist
+
+    if timestamped:
+        timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+        path = os.path.join(date_folder, f'{prefix}_{timestamp}')
+    else:
+        path = os.path.join(date_folder, prefix)
+    tmp_path = f'{path}.tmp'
+    os.makedirs(tmp_path, exist_ok=True)
+    for key, df_partition in df.groupby(partition_by, sort=True):
+        categorical = df_partition.select_dtypes("category").columns
+        if len(categorical):
+            df_partition = df_partition.copy(deep=False)
+            for col in categorical:
+                df_partition[col] = df_partition[col].cat.remove_unused_categories()
+        df_partition.to_parquet(os.path.join(tmp_path, f'{key}.parquet'), index=False)
+    for key, partition_path in (unchanged_partitions or {}).items():
+        # written datasets are never modified, so sharing their files is safe
+        try:
+            os.link(partition_path, os.path.join(tmp_path, f'{key}.parquet'))
+        except OSError:
+            shutil.copy2(partition_path, os.path.join(tmp_path, f'{key}.parquet'))
+    os.replace(tmp_path, path)
+    return path
+
+def parquet_dataset_partitions(path: str) -> dict:
+    """
+    Lists the Parquet partitions of a dataset folder written by `write_partitioned_parquet`.
+    :param path: Path to dataset folder
+    :return: dict of partition key (int where numeric, e.g. the year) to file path, in key order
+    """
+    partitions = {}
+    for f in os.listdir(path):
+        if not f.endswith('.parquet'):
+            continue
+        key = f[:-len('.parquet')]
+        partitions[int(key) if key.isdigit() else key] = os.path.join(path, f)
+    return dict(sorted(partitions.items()))
+
+def read_parquet_dataset(path: str, partitions = None, columns: list | None = None) -> pd.DataFrame:
+    """
+    Reads a folder of Parquet partitions written by `write_partitioned_parquet`, in partition order.
+    Only the requested partitions and columns are read from disk. Categorical columns are read back as categoricals
+    with the sorted union of the categories of the partitions read.
+    :param path: Path to dataset folder
+    :param partitions: partition keys to read, e.g. years. None reads all partitions
+    :param columns: columns to read. None reads all columns
+    :return: pd.DataFrame
+    """
+    files = parquet_dataset_partitions(path)
+    if partitions is not None:
+        keys = set(partitions)
+        files = {key: f for key, f in files.items() if key in keys}
+    if not files:
+        raise FileNotFoundError(f"No Parquet partitions found in {path} for {partitions}")
+    frames = [pd.read_parquet(f, columns=columns) for f in files.values()]
+    if len(frames) == 1:
+        return frames[0]
+    for col in frames[0].select_dtypes("category").columns:
+        # partitions store different categories, and concatenating those would give object columns
+        categories = union_categoricals([frame[col] for frame in frames], sort_categories=True).categories
+        for frame in frames:
+            frame[col] = frame[col].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
 def read_csv(filepath: str) -> pd.DataFrame:
     """
      Reads csv as pandas DataFrame.
@@ -62,4 +199,17 @@ def write_to_json(filepath:str, data:list|dict) -> str:
     """
     with open(filepath, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=4, ensure_ascii=False)
-    return filepath
\ No newline at end of file
+    return filepath
+
+def file_sha256(filepath:str, chunk_size:int = 1 << 20) -> str:
+    """
+    Computes the SHA-256 hash of a file's contents
+    :param filepath: Path to file
+    :param chunk_size: Number of bytes read at a time
+    :return: hex digest of the file contents
+    """
+    sha = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
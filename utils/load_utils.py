@@ -1,14 +1,143 @@
 import glob
+import json
 import os
-from typing import Dict, List
+import warnings
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Dict, Iterable, List
 
+import numpy as np
 import pandas as pd
 
-from config import RAW_DELAY_DIR, LOG_DIR
-from utils import log_utils
+from config import RAW_DELAY_DIR, LOG_DIR, RAW_SHEET_CACHE_DIR
+from utils import log_utils, file_utils
 
+RAW_FILE_PATTERNS = ["*.xlsx"]
 
-def load_raw_data_files(raw_delay_dir:str=RAW_DELAY_DIR , log_dir:str=LOG_DIR, verbose=True) \
+
+def _sheet_names(file_path: str) -> List[str]:
+    """
+    Lists the sheet names of an Excel workbook without parsing the sheets.
+    :param file_path: Path to Excel workbook
+    :return: list of sheet names
+    """
+    with pd.ExcelFile(file_path) as workbook:
+        return workbook.sheet_names
+
+def _read_sheet(file_path: str, sheet_name: str) -> pd.DataFrame:
+    """
+    Reads a single sheet of an Excel workbook. Kept at module level so it can be sent to worker processes.
+    :param file_path: Path to Excel workbook
+    :param sheet_name: Name of the sheet to read
+    :return: pd.DataFrame
+    """
+    return pd.read_excel(file_path, sheet_name=sheet_name)
+
+def _submit_workbooks(executor: Executor, all_files: List[str]) -> Dict[str, Dict[str, Future] | Exception]:
+    """
+    Submits every sheet of every workbook to the executor so that files and sheets are parsed concurrently.
+    :param executor: Executor running the parsing jobs
+    :param all_files: Paths to Excel workbooks
+    :return: dict mapping file path to {sheet name: Future}, or to the exception raised while listing its sheets
+    """
+    name_futures = {file_path: executor.submit(_sheet_names, file_path) for file_path in all_files}
+    pending = {}
+    for file_path, future in name_futures.items():
+        try:
+            pending[file_path] = {name: executor.submit(_read_sheet, file_path, name) for name in future.result()}
+        except Exception as e:
+            pending[file_path] = e
+    return pending
+
+def _gather_sheets(pending_sheets: Dict[str, Future] | Exception) -> Dict[str, pd.DataFrame]:
+    """
+    Waits for the sheets of one workbook, re-raising any parsing error so it is logged like a serial read.
+    :param pending_sheets: {sheet name: Future} or the exception raised while listing the sheets
+    :return: dict mapping sheet name to pd.DataFrame, in workbook order
+    """
+    if isinstance(pending_sheets, Exception):
+        raise pending_sheets
+    return {name: future.result() for name, future in pending_sheets.items()}
+
+def _read_cached_workbook(file_hash: str, cache_dir: str) -> Dict[str, pd.DataFrame] | None:
+    """
+    Reads the parsed sheets of a workbook from the cache.
+    :param file_hash: Content hash of the workbook
+    :param cache_dir: Directory holding the parsed-sheet cache
+    :return: dict mapping sheet name to pd.DataFrame, or None on a cache miss
+    """
+    index_path = os.path.join(cache_dir, f"{file_hash}.json")
+    if not os.path.isfile(index_path):
+        return None
+
+    with open(index_path, "r", encoding="utf-8") as f:
+        sheet_names = json.load(f)
+
+    sheets_dict = {}
+    for i, name in enumerate(sheet_names):
+        sheet_df = pd.read_parquet(os.path.join(cache_dir, f"{file_hash}_{i}.parquet"))
+        # Parquet returns missing strings as None, the Excel reader returns NaN
+        object_cols = sheet_df.select_dtypes(include="object").columns
+        sheet_df[object_cols] = sheet_df[object_cols].fillna(np.nan)
+        sheets_dict[name] = sheet_df
+    return sheets_dict
+
+def _mixed_columns_as_text(sheet_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts object columns holding values of more than one type (e.g. datetime.time cells next to text), which
+    Parquet cannot store, to strings. Missing values stay missing. The cleaning stages read these columns as text,
+    so a cached sheet cleans the same as a freshly parsed one.
+    :param sheet_df: parsed sheet
+    :return: sheet with mixed-type columns as strings
+    """
+    mixed = [col for col in sheet_df.select_dtypes(include="object").columns
+             if sheet_df[col].dropna().map(type).nunique() > 1]
+    if not mixed:
+        return sheet_df
+    sheet_df = sheet_df.copy()
+    for col in mixed:
+        values = sheet_df[col]
+        sheet_df[col] = values.where(values.isna(), values.astype(str))
+    return sheet_df
+
+def _write_cached_workbook(file_hash: str, sheets_dict: Dict[str, pd.DataFrame], cache_dir: str) -> None:
+    """
+    Writes the parsed sheets of a workbook to the cache, one Parquet file per sheet index.
+    The sheet-name index is written last so a partially written entry is never read back.
+    :param file_hash: Content hash of the workbook
+    :param sheets_dict: dict mapping sheet name to pd.DataFrame
+    :param cache_dir: Directory holding the parsed-sheet cache
+    :return: None
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    for i, sheet_df in enumerate(sheets_dict.values()):
+        _mixed_columns_as_text(sheet_df).to_parquet(os.path.join(cache_dir, f"{file_hash}_{i}.parquet"))
+
+    with open(os.path.join(cache_dir, f"{file_hash}.json"), "w", encoding="utf-8") as f:
+        json.dump(list(sheets_dict.keys()), f)
+
+def _raw_data_files(raw_delay_dir: str) -> List[str]:
+    """
+    Lists the supported raw data files (Excel) in a directory.
+    :param raw_delay_dir: Directory containing the raw data files.
+    :return: sorted list of file paths
+    """
+    all_files = []
+    for pattern in RAW_FILE_PATTERNS:
+        all_files.extend(glob.glob(os.path.join(raw_delay_dir, pattern)))
+    return sorted(all_files)
+
+def raw_file_hashes(raw_delay_dir: str = RAW_DELAY_DIR) -> Dict[str, str]:
+    """
+    Content hashes of the raw data files, e.g. to record which workbooks a processed dataset was built from.
+    :param raw_delay_dir: Directory containing the raw data files.
+    :return: dict mapping file name to SHA-256, in file order
+    """
+    return {os.path.basename(file_path): file_utils.file_sha256(file_path)
+            for file_path in _raw_data_files(raw_delay_dir)}
+
+def load_raw_data_files(raw_delay_dir:str=RAW_DELAY_DIR , log_dir:str=LOG_DIR, verbose=True,
+                        parallel: bool = False, max_workers: int | None = None, use_cache: bool = True,
+                        cache_dir: str = RAW_SHEET_CACHE_DIR, skip_hashes: Iterable[str] | None = None) \
         ->  Dict[str, List[pd.DataFrame]]:
     """
     Load all supported raw data files (Excel) and read *all* sheets.
@@ -16,17 +145,21 @@ def load_raw_data_files(raw_delay_dir:str=RAW_DELAY_DIR , log_dir:str=LOG_DIR, v
     :param raw_delay_dir: Directory containing the raw data files.
     :param log_dir: Directory where logs should be written.
     :param verbose: If True, print status messages while loading.
+    :param parallel: If True, parse files and their sheets concurrently in a process pool. Falls back to parsing them
+    one after the other on a single-CPU machine, where the pool only adds overhead.
+    :param max_workers: Number of worker processes when parallel, defaults to the number of CPUs.
+    :param use_cache: If True, reuse parsed sheets of workbooks whose content hash is already cached and
+    cache newly parsed ones.
+    :param cache_dir: Directory holding the parsed-sheet cache.
+    :param skip_hashes: SHA-256 of workbooks to leave out, e.g. those an incremental run has already processed.
     :return: dict mapping file path to list of DataFrames (one per sheet).
     """
 
     log_lines = []
     file_to_sheets= {} # dict mapping file path to list of dataframes (one per sheet).
 
-    file_patterns = ["*.xlsx"]
-    all_files = []
-    for pattern in file_patterns:
-        all_files.extend(glob.glob(os.path.join(raw_delay_dir, pattern)))
-    all_files = sorted(all_files)
+    file_patterns = RAW_FILE_PATTERNS
+    all_files = _raw_data_files(raw_delay_dir)
 
     # if no datafiles
     if not all_files:
@@ -37,11 +170,53 @@ def load_raw_data_files(raw_delay_dir:str=RAW_DELAY_DIR , log_dir:str=LOG_DIR, v
         log_utils.write_log(log_lines, "raw_delay_load_log", log_dir)
         return file_to_sheets
 
-    for file_path in all_files:
+    # only workbooks whose bytes changed since they were last parsed need to be read again
+    file_hashes = {file_path: file_utils.file_sha256(file_path) for file_path in all_files} \
+        if use_cache or skip_hashes else {}
+    if skip_hashes:
+        skip_hashes = set(skip_hashes)
+        skipped = [file_path for file_path in all_files if file_hashes[file_path] in skip_hashes]
+        log_lines.extend(f"Skipping {file_path}: unchanged since it was processed" for file_path in skipped)
+        all_files = [file_path for file_path in all_files if file_path not in skipped]
+        if verbose:
+            print(f"{len(all_files)} raw file(s) changed since they were processed")
+    cached = {}
+    for file_path in all_files if use_cache else []:
+        try:
+            sheets_dict = _read_cached_workbook(file_hashes[file_path], cache_dir)
+        except Exception as e:
+            log_lines.append(f"Ignoring unreadable cache entry for {file_path}: {e}")
+            sheets_dict = None
+        if sheets_dict is not None:
+            cached[file_path] = sheets_dict
+    to_parse = [file_path for file_path in all_files if file_path not in cached]
+
+    if parallel and (os.cpu_count() or 1) == 1:
+        log_lines.append("Single CPU: parsing workbooks one after the other")
+        parallel = False
+    executor = ProcessPoolExecutor(max_workers=max_workers) if parallel and to_parse else None
+    try:
+        pending = _submit_workbooks(executor, to_parse) if executor is not None else {}
+        for file_path in all_files:
             try:
                 # Read *all* sheets into a dict
                 i = 0
-                sheets_dict = pd.read_excel(file_path, sheet_name=None)
+                if file_path in cached:
+                    sheets_dict = cached[file_path]
+                    log_lines.append(f"Read {file_path} from parsed-sheet cache")
+                elif parallel:
+                    sheets_dict = _gather_sheets(pending[file_path])
+                else:
+                    sheets_dict = pd.read_excel(file_path, sheet_name=None)
+
+                if use_cache and file_path not in cached:
+                    try:
+                        _write_cached_workbook(file_hashes[file_path], sheets_dict, cache_dir)
+                    except Exception as e:
+                        # the workbook will be parsed again on every run until this is fixed
+                        msg = f"Could not cache {file_path}, it will be parsed on every run: {e}"
+                        log_lines.append(msg)
+                        warnings.warn(msg)
                 # the sheets either have 1 sheet or 12 sheets, one for each month
                 n = len(sheets_dict)
                 if n not in (1,12):
@@ -72,6 +247,11 @@ def load_raw_data_files(raw_delay_dir:str=RAW_DELAY_DIR , log_dir:str=LOG_DIR, v
             if verbose:
                 print(summary)
 
+    finally:
+        # also on errors, so worker processes are never left behind
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
     log_utils.write_log(log_lines, "raw_delay_load_log", log_dir)
 
-    return file_to_sheets
\ No newline at end of file
+    return file_to_sheets
@@ -1,3 +1,4 @@
+import json
 import os
 from datetime import datetime
 
@@ -31,6 +32,24 @@ def write_log(log_lines:list, prefix: str, log_dir = LOG_DIR) -> str:
             f.write(line + '\n')
     return log_path
 
+def write_json_log(data: dict | list, prefix: str, log_dir = LOG_DIR) -> str:
+    """
+    Writes machine-readable log data as JSON and saves to disk, next to the text logs
+    :param data: JSON-serializable data
+    :param prefix: prefix of log file name
+    :param log_dir: log directory
+    :return: log_path: absolute path of log
+    """
+    date_str = datetime.now().strftime('%Y-%m-%d')
+    date_folder = os.path.join(log_dir, date_str)
+    os.makedirs(date_folder, exist_ok=True)  # Create folder if it doesn't exist
+
+    timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+    log_path = os.path.join(date_folder, f'{prefix}_{timestamp}.json')
+    with open(log_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=4)
+    return log_path
+
 def log_unique_stations_by_category(df:pd.DataFrame, log_dir:str = LOG_DIR) -> None:
     """
     Logs unique station names by each category into separate text files.
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from config import PROCESSED_DELAY_DIR
+from utils import file_utils
+
+"""
+Utility functions for the manifest of processed delay datasets.
+
+The preprocessing pipeline records every dataset it writes in `manifest.json` in the processed delay directory:
+dataset id (derived from the content hash), path relative to the processed directory, SHA-256 of the contents,
+row count, min/max DateTime, schema and the SHA-256 of the raw workbooks it was built from. The manifest points at the latest dataset, so loaders find it without
+scanning folders, and any recorded version can be pinned by id.
+"""
+
+MANIFEST_FILE_NAME = "manifest.json"
+DATASET_ID_LENGTH = 16 # hex characters of the content hash used as the dataset id
+
+def manifest_path(processed_delay_dir: str = PROCESSED_DELAY_DIR) -> str:
+    """
+    Path of the manifest in a processed delay directory
+    :param processed_delay_dir: processed delay directory
+    :return: path to manifest.json
+    """
+    return os.path.join(processed_delay_dir, MANIFEST_FILE_NAME)
+
+def dataset_sha256(path: str) -> str:
+    """
+    Computes the SHA-256 of a dataset: of the file, or for a dataset folder, of its Parquet partition names and
+    contents in order
+    :param path: dataset folder or file
+    :return: hex digest
+    """
+    if not os.path.isdir(path):
+        return file_utils.file_sha256(path)
+    sha = hashlib.sha256()
+    for partition_path in file_utils.parquet_dataset_partitions(path).values():
+        sha.update(os.path.basename(partition_path).encode("utf-8"))
+        sha.update(bytes.fromhex(file_utils.file_sha256(partition_path)))
+    return sha.hexdigest()
+
+def read_manifest(processed_delay_dir: str = PROCESSED_DELAY_DIR) -> dict | None:
+    """
+    Reads the manifest
+    :param processed_delay_dir: processed delay directory
+    :return: manifest dict, or None if there is no readable manifest
+    """
+    try:
+        with open(manifest_path(processed_delay_dir), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def record_dataset(dataset_path: str, df: pd.DataFrame, processed_delay_dir: str = PROCESSED_DELAY_DIR,
+                   sources: dict | None = None) -> dict:
+    """
+    Adds a written dataset to the manifest and makes it the latest. The manifest is replaced atomically.
+    :param dataset_path: path of the written dataset folder or file
+    :param df: the written pd.DataFrame, for row count, DateTime range and schema
+    :param processed_delay_dir: processed delay directory
+    :param sources: dict of raw file name to SHA-256 of the files the dataset was built from
+    :return: manifest entry of the dataset
+    """
+    sha256 = dataset_sha256(dataset_path)
+    entry = {
+        "id": sha256[:DATASET_ID_LENGTH],
+        "path": os.path.relpath(dataset_path, processed_delay_dir).replace(os.sep, "/"),
+        "sha256": sha256,
+        "rows": int(len(df)),
+        "min_datetime": df["DateTime"].min().isoformat() if len(df) else None,
+        "max_datetime": df["DateTime"].max().isoformat() if len(df) else None,
+        "schema": {col: str(dtype) for col, dtype in df.dtypes.items()},
+        "sources": sources or {},
+        "created": datetime.now().isoformat(timespec="seconds"),
+    }
+
+    manifest = read_manifest(processed_delay_dir) or {"latest": None, "datasets": {}}
+    manifest["datasets"][entry["id"]] = entry
+    manifest["latest"] = entry["id"]
+
+    path = manifest_path(processed_delay_dir)
+    tmp_path = f"{path}.tmp"
+    file_utils.write_to_json(tmp_path, manifest)
+    os.replace(tmp_path, path)
+    return entry
+
+def resolve_dataset(processed_delay_dir: str = PROCESSED_DELAY_DIR, version: str | None = None) -> dict | None:
+    """
+    Looks up a dataset in the manifest
+    :param processed_delay_dir: processed delay directory
+    :param version: dataset id (or a unique prefix of it) to pin. None for the latest dataset
+    :return: manifest entry with an absolute "path", or None if there is no manifest or the latest dataset is missing
+    :raises KeyError: if the pinned version is not in the manifest
+    """
+    manifest = read_manifest(processed_delay_dir)
+    if version is not None:
+        datasets = (manifest or {}).get("datasets", {})
+        matches = [dataset_id for dataset_id in datasets if dataset_id.startswith(version)]
+        if len(matches) != 1:
+            raise KeyError(f"Dataset version {version!r} not found in {manifest_path(processed_delay_dir)}")
+        entry = dict(datasets[matches[0]])
+    elif manifest and manifest.get("latest") in manifest.get("datasets", {}):
+        entry = dict(manifest["datasets"][manifest["latest"]])
+    else:
+        return None
+
+    entry["path"] = os.path.join(processed_delay_dir, *entry["path"].split("/"))
+    if not os.path.exists(entry["path"]):
+        if version is not None:
+            raise FileNotFoundError(f"Dataset version {version!r} is missing: {entry['path']}")
+        return None
+    return entry
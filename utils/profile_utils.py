@@ -0,0 +1,167 @@
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+from config import LOG_DIR
+from utils import log_utils
+
+try:
+    import resource # Unix only
+except ImportError:
+    resource = None
+
+"""
+Utility for profiling the stages of the TTC delay data preprocessing pipeline.
+
+For each stage it records:
+- wall time and CPU time
+- how much the stage raised the peak resident set size (RSS) of the process, and that peak after the stage (the
+  process high-water mark so far, not the stage's own use)
+- memory allocated by Python during the stage (tracemalloc net and peak), if enabled
+- rows in and rows out, for stages taking and returning a DataFrame
+
+The report is written as JSON next to the pipeline logs, optionally with a trace in Chrome trace event format that
+can be opened as a flame chart in Perfetto (ui.perfetto.dev), chrome://tracing or speedscope. Use the profiler as a
+context manager so memory tracing is stopped however the run ends.
+"""
+
+def _peak_rss_mb() -> float | None:
+    """
+    Peak resident set size of the process so far, in MB
+    :return: peak RSS, or None where the resource module is unavailable
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def _num_rows(obj) -> int | None:
+    """Number of rows of a DataFrame, None for anything else"""
+    return len(obj) if isinstance(obj, pd.DataFrame) else None
+
+
+class StageProfiler:
+    """
+    Runs pipeline stages and records their time, memory and row counts.
+    A disabled profiler calls the stages directly without recording anything.
+    Memory tracing started by the profiler is stopped by `stop`, on leaving a `with` block or by `write_report`.
+    """
+
+    def __init__(self, enabled: bool = True, trace_memory: bool = True):
+        """
+        :param enabled: If False, stages are run without profiling
+        :param trace_memory: If True, track Python allocations per stage with tracemalloc (slows stages down)
+        """
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        self.stages = []
+        self._started_tracing = False
+        self._start = time.perf_counter()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def __enter__(self) -> "StageProfiler":
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.stop()
+
+    def stop(self):
+        """Stops memory tracing if this profiler started it"""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def run(self, name: str, func, *args, **kwargs):
+        """
+        Runs func(*args, **kwargs) as a named stage. Rows in are counted from the first argument.
+        :param name: stage name
+        :param func: stage function
+        :return: result of func
+        """
+        if not self.enabled:
+            return func(*args, **kwargs)
+
+        rows_in = _num_rows(args[0]) if args else None
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            traced_before = tracemalloc.get_traced_memory()[0]
+
+        peak_rss_before = _peak_rss_mb()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        result = func(*args, **kwargs)
+        cpu_s = time.process_time() - cpu_start
+        wall_end = time.perf_counter()
+
+        stage = {
+            "stage": name,
+            "start_s": round(wall_start - self._start, 6),
+            "wall_s": round(wall_end - wall_start, 6),
+            "cpu_s": round(cpu_s, 6),
+            "rows_in": rows_in,
+            "rows_out": _num_rows(result),
+        }
+        process_peak_rss = _peak_rss_mb()
+        # the peak only grows if the stage went above every earlier stage
+        stage["peak_rss_growth_mb"] = None if process_peak_rss is None else round(process_peak_rss - peak_rss_before, 3)
+        stage["process_peak_rss_mb"] = process_peak_rss
+        if self.trace_memory:
+            traced_after, traced_peak = tracemalloc.get_traced_memory()
+            stage["alloc_delta_mb"] = round((traced_after - traced_before) / (1024 * 1024), 3)
+            stage["alloc_peak_mb"] = round((traced_peak - traced_before) / (1024 * 1024), 3)
+        self.stages.append(stage)
+        return result
+
+    def report(self) -> dict:
+        """
+        Profile report of the stages run so far
+        :return: dict with run metadata and one entry per stage
+        """
+        return {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "total_wall_s": round(sum(stage["wall_s"] for stage in self.stages), 6),
+            "total_cpu_s": round(sum(stage["cpu_s"] for stage in self.stages), 6),
+            "trace_memory": self.trace_memory,
+            "stages": self.stages,
+        }
+
+    def trace_events(self) -> dict:
+        """
+        Stages as complete events in Chrome trace event format, e.g. for Perfetto or speedscope
+        :return: dict with a 'traceEvents' list, timestamps in microseconds
+        """
+        events = []
+        for stage in self.stages:
+            events.append({
+                "name": stage["stage"],
+                "ph": "X",
+                "ts": int(stage["start_s"] * 1e6),
+                "dur": int(stage["wall_s"] * 1e6),
+                "pid": os.getpid(),
+                "tid": 0,
+                "args": {key: value for key, value in stage.items() if key not in ("stage", "start_s", "wall_s")},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_report(self, prefix: str, log_dir: str = LOG_DIR, trace: bool = True) -> list[str]:
+        """
+        Writes the profile report, and optionally the trace, next to the pipeline logs. Stops memory tracing if this
+        profiler started it.
+        :param prefix: prefix of the report file name
+        :param log_dir: log directory
+        :param trace: If True, also write the Chrome trace event file
+        :return: paths of the written files
+        """
+        paths = [log_utils.write_json_log(self.report(), prefix, log_dir)]
+        if trace:
+            paths.append(log_utils.write_json_log(self.trace_events(), f"{prefix}_trace", log_dir))
+
+        self.stop()
+        return paths
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+"""
+Column dtypes of the cleaned TTC subway delay data.
+
+The processed dataset written by the preprocessing pipeline and every frame loaded by `TTCLoader` conform to
+`DELAY_SCHEMA`:
+- low-cardinality text (stations, codes, dates, times, categories, ...) as categoricals with sorted categories
+- delay minutes as int16 and vehicle numbers as int32
+- DateTime as a timestamp and IsWeekday as a boolean
+"""
+
+DELAY_SCHEMA = {
+    "Date": "category",
+    "Time": "category",
+    "Day": "category",
+    "Station": "category",
+    "Code": "category",
+    "Min Delay": "int16",
+    "Min Gap": "int16",
+    "Bound": "category",
+    "Line": "category",
+    "Vehicle": "int32",
+    "Station Category": "category",
+    "DateTime": "datetime64[ns]",
+    "IsWeekday": "bool",
+    "Rush Hour": "category",
+    "Season": "category",
+    "Delay Category": "category",
+    "Delay Description": "category",
+}
+
+def _to_integer(values: pd.Series, dtype: str) -> pd.Series:
+    """
+    Casts whole numbers to a smaller integer dtype, checking they fit
+    :param values: numeric pd.Series without missing values
+    :param dtype: integer dtype, e.g. "int16"
+    :return: pd.Series of dtype
+    """
+    limits = np.iinfo(dtype)
+    if len(values) and (values.min() < limits.min or values.max() > limits.max):
+        raise ValueError(f"{values.name} values outside the {dtype} range: {values.min()} to {values.max()}")
+    return values.astype(dtype)
+
+def apply_schema(df: pd.DataFrame, schema: dict = DELAY_SCHEMA) -> pd.DataFrame:
+    """
+    Casts the columns of df that are in the schema. Columns already of the right dtype are left as they are, so
+    applying the schema to conforming data is cheap.
+    :param df: pd.DataFrame, e.g. cleaned delay data or a subset of its columns
+    :param schema: column: dtype
+    :return: pd.DataFrame conforming to the schema
+    """
+    df = df.copy(deep=False)
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+        values = df[col]
+        if dtype == "category":
+            if not isinstance(values.dtype, pd.CategoricalDtype):
+                df[col] = pd.Categorical(np.asarray(values, dtype=object))
+        elif values.dtype != dtype:
+            if dtype.startswith("int"):
+                df[col] = _to_integer(values, dtype)
+            elif dtype.startswith("datetime"):
+                df[col] = pd.to_datetime(values)
+            else:
+                df[col] = values.astype(dtype)
+    return df
+
+def memory_report(df_before: pd.DataFrame, df_after: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compares the memory use of a frame before and after applying the schema
+    :param df_before: pd.DataFrame before
+    :param df_after: pd.DataFrame after
+    :return: pd.DataFrame of dtype and MB per column before and after, the ratio, and a Total row
+    """
+    mb = 1024 * 1024
+    report = pd.DataFrame({
+        "dtype_before": df_before.dtypes.astype(str),
+        "mb_before": df_before.memory_usage(deep=True, index=False) / mb,
+        "dtype_after": df_after.dtypes.astype(str),
+        "mb_after": df_after.memory_usage(deep=True, index=False) / mb,
+    })
+    report.loc["Total"] = ["", report["mb_before"].sum(), "", report["mb_after"].sum()]
+    report["ratio"] = report["mb_before"] / report["mb_after"]
+    return report.round(3)
@@ -0,0 +1,64 @@
+import json
+import os
+import tempfile
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+
+"""
+Shares a loaded delay DataFrame between processes as a memory-mapped Arrow IPC file.
+
+The parent process writes the frame once (uncompressed, to /dev/shm where available, so the file lives in shared
+memory), and worker processes attach to it by path. Attaching maps the file instead of reading it: numeric,
+timestamp and categorical code columns are views of the shared pages, so N workers cost one copy of the data and
+attaching takes milliseconds. Attached frames are read-only.
+"""
+
+# tmpfs backed by shared memory on Linux; elsewhere a regular temp folder, still memory-mapped
+SHARED_DATASET_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+_METADATA_KEY = b"ttc_shared_dataset"
+
+def share_dataframe(df: pd.DataFrame, metadata: dict | None = None, shared_dir: str = SHARED_DATASET_DIR) -> str:
+    """
+    Writes a DataFrame as an Arrow IPC file for other processes to attach to
+    :param df: pd.DataFrame to share
+    :param metadata: JSON-serializable metadata stored with the data, e.g. the dataset id
+    :param shared_dir: folder of the shared file, shared memory by default
+    :return: path of the shared file, to pass to `attach_dataframe`
+    """
+    table = pa.Table.from_pandas(df)
+    schema_metadata = dict(table.schema.metadata or {})
+    schema_metadata[_METADATA_KEY] = json.dumps(metadata or {}).encode("utf-8")
+    table = table.replace_schema_metadata(schema_metadata)
+
+    path = os.path.join(shared_dir, f"ttc_delays_{uuid.uuid4().hex}.arrow")
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path) # attachers never see a partial file
+    return path
+
+def attach_dataframe(path: str) -> tuple[pd.DataFrame, dict]:
+    """
+    Attaches to a DataFrame shared with `share_dataframe`, without copying its column data
+    :param path: path of the shared file
+    :return: read-only pd.DataFrame and the metadata stored with it
+    """
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    metadata = json.loads((table.schema.metadata or {}).get(_METADATA_KEY, b"{}"))
+    # one block per column so arrays stay views of the mapped file
+    df = table.to_pandas(split_blocks=True)
+    return df, metadata
+
+def release_dataframe(path: str):
+    """
+    Removes a shared file. Processes already attached keep their mapping until they exit.
+    :param path: path of the shared file
+    """
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
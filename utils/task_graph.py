@@ -0,0 +1,111 @@
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+"""
+Runs a small graph of tasks, such as the stats exports, concurrently in a process pool.
+
+Each task is a module-level function (so it can be sent to worker processes) with its keyword arguments and the names
+of the tasks it depends on. A task is submitted as soon as all its dependencies have succeeded. A task that raises is
+recorded as failed with its traceback and does not stop the tasks that do not depend on it; tasks depending on a
+failed task are skipped. Every task is timed in the process that runs it.
+"""
+
+def _run_task(func, kwargs: dict) -> tuple:
+    """
+    Runs a task, catching its error. Kept at module level so it can be sent to worker processes.
+    :param func: task function
+    :param kwargs: keyword arguments of func
+    :return: (result, traceback of the error or None, run time in seconds)
+    """
+    start = time.perf_counter()
+    try:
+        return func(**kwargs), None, time.perf_counter() - start
+    except Exception:
+        return None, traceback.format_exc(), time.perf_counter() - start
+
+def _check_graph(tasks: dict):
+    """
+    Checks that every dependency is a task and that there are no cycles
+    :param tasks: task graph, see `run_task_graph`
+    :raises ValueError: on an unknown dependency or a cycle
+    """
+    for name, task in tasks.items():
+        unknown = set(task.get("deps", [])) - set(tasks)
+        if unknown:
+            raise ValueError(f"Task {name!r} depends on unknown tasks {sorted(unknown)}")
+
+    done = set()
+    remaining = dict(tasks)
+    while remaining:
+        ready = [name for name, task in remaining.items() if set(task.get("deps", [])) <= done]
+        if not ready:
+            raise ValueError(f"Tasks {sorted(remaining)} have cyclic dependencies")
+        done.update(ready)
+        for name in ready:
+            del remaining[name]
+
+def run_task_graph(tasks: dict, parallel: bool = True, max_workers: int | None = None,
+                   initializer = None, initargs: tuple = ()) -> dict:
+    """
+    Runs a task graph, each task as soon as its dependencies have succeeded
+    :param tasks: dict of task name to {"func": function, "kwargs": dict (optional), "deps": list of task names
+    (optional)}, e.g. {"line_stats": {"func": export_line_stats, "kwargs": {"year_start": 2023}}}
+    :param parallel: If True, run the tasks in a process pool, otherwise one after the other in this process
+    :param max_workers: Number of worker processes when parallel, defaults to the number of CPUs
+    :param initializer: function run once in each worker process (and in this process when not parallel) before its
+    tasks, e.g. to attach to a shared dataset
+    :param initargs: arguments of initializer
+    :return: dict of task name to {"status": "ok" | "failed" | "skipped", "seconds": run time, "result": return
+    value, "error": traceback}, in the order of tasks
+    :raises ValueError: if a task depends on an unknown task or the dependencies are cyclic
+    """
+    _check_graph(tasks)
+    reports = {name: {"status": "pending", "seconds": None, "result": None, "error": None} for name in tasks}
+    pending = dict(tasks)
+
+    def ready_tasks() -> list:
+        """Pending tasks whose dependencies succeeded; skips those with a dependency that failed or was skipped"""
+        ready = []
+        for name, task in list(pending.items()):
+            statuses = [reports[dep]["status"] for dep in task.get("deps", [])]
+            if any(status in ("failed", "skipped") for status in statuses):
+                reports[name].update(status="skipped", error=f"Skipped: a dependency of {name!r} did not succeed")
+                del pending[name]
+            elif all(status == "ok" for status in statuses):
+                ready.append(name)
+        return ready
+
+    def record(name: str, outcome: tuple):
+        """Records the outcome of a task run by `_run_task`"""
+        result, error, seconds = outcome
+        reports[name].update(status="ok" if error is None else "failed", result=result, error=error,
+                             seconds=seconds)
+
+    if not parallel:
+        if initializer is not None:
+            initializer(*initargs)
+        ready = ready_tasks()
+        while ready:
+            for name in ready:
+                task = pending.pop(name)
+                record(name, _run_task(task["func"], task.get("kwargs", {})))
+            ready = ready_tasks()
+        return reports
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=initializer, initargs=initargs) as executor:
+        running = {}
+        while True:
+            for name in ready_tasks():
+                task = pending.pop(name)
+                running[executor.submit(_run_task, task["func"], task.get("kwargs", {}))] = name
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    record(name, future.result())
+                except Exception: # the worker died or the task could not be sent to it
+                    record(name, (None, traceback.format_exc(), None))
+    return reports
@@ -1,19 +1,189 @@
 import os
+from collections import OrderedDict
 from types import MappingProxyType
-from typing import Self, Mapping
+from typing import Self, Mapping, Iterable
 
+import numpy as np
 import pandas as pd
 
 from config import PROCESSED_DELAY_DIR, PROCESSED_CODE_DESCRIPTIONS_FILE
-from utils import file_utils
+from utils import file_utils, manifest_utils, schema, shared_dataset
+
+
+# Row masks for the filter plan, keyed by operation: mask(df, *args) -> boolean Series
+_PLAN_MASKS = {
+    "eq": lambda df, col, value: df[col] == value,
+    "isin": lambda df, col, values: df[col].isin(values),
+    "between": lambda df, col, start, end: df[col].between(start, end),
+    "time_range": lambda df, start, end: _time_range_mask(df["DateTime"], start, end),
+    "years_between": lambda df, year_start, year_end: df["DateTime"].dt.year.between(year_start, year_end),
+    "month": lambda df, month: df["DateTime"].dt.month == month,
+    "weekend": lambda df, weekend: (df["DateTime"].dt.weekday >= 5) == weekend,
+}
+
+
+def enable_copy_on_write():
+    """
+    Turns on pandas copy-on-write for the process (always on from pandas 3). Frames handed out by TTCLoader share
+    memory with the loaded frame; with copy-on-write, writing to one of them copies the affected columns first instead
+    of changing the loaded frame. Call once at the entry point of an application, before loading.
+    """
+    if int(pd.__version__.split(".")[0]) < 3:
+        pd.set_option("mode.copy_on_write", True)
+
+def _time_range_mask(datetimes: pd.Series, start: pd.Timestamp | None, end: pd.Timestamp | None) -> pd.Series:
+    """Mask of start <= DateTime < end, for unsorted data"""
+    mask = pd.Series(True, index=datetimes.index)
+    if start is not None:
+        mask &= datetimes >= start
+    if end is not None:
+        mask &= datetimes < end
+    return mask
+
+def _year_range(year_start: int, year_end: int) -> tuple[pd.Timestamp, pd.Timestamp]:
+    """Time range [start, end) covering year_start to year_end inclusive"""
+    return pd.Timestamp(year=year_start, month=1, day=1), pd.Timestamp(year=year_end + 1, month=1, day=1)
+
+def _search_time_range(datetimes: pd.Series, start: pd.Timestamp | None, end: pd.Timestamp | None) -> tuple[int, int]:
+    """
+    Binary search a sorted DateTime column
+    :return: row positions [lo, hi) with start <= DateTime < end
+    """
+    lo = 0 if start is None else int(datetimes.searchsorted(start, side="left"))
+    hi = len(datetimes) if end is None else int(datetimes.searchsorted(end, side="left"))
+    return lo, max(lo, hi)
+
+def select_time_range(df: pd.DataFrame, start = None, end = None) -> pd.DataFrame:
+    """
+    Select rows with start <= DateTime < end. On DateTime-sorted data (as written by the preprocessing pipeline)
+    this is a binary search returning a contiguous slice without copying; otherwise a mask.
+    :param df: pd.DataFrame with a DateTime column
+    :param start: start timestamp (inclusive), e.g. "2024-03-01". None for no lower bound
+    :param end: end timestamp (exclusive). None for no upper bound
+    :return: pd.DataFrame of the selected rows, a slice sharing memory with df (see `enable_copy_on_write`)
+    """
+    start = None if start is None else pd.Timestamp(start)
+    end = None if end is None else pd.Timestamp(end)
+    if df["DateTime"].is_monotonic_increasing:
+        lo, hi = _search_time_range(df["DateTime"], start, end)
+        return df.iloc[lo:hi]
+    return df[_time_range_mask(df["DateTime"], start, end)]
+
+def select_years(df: pd.DataFrame, year_start: int, year_end: int) -> pd.DataFrame:
+    """
+    Select rows from year_start to year_end inclusive, see `select_time_range`
+    :param df: pd.DataFrame with a DateTime column
+    :param year_start: start year
+    :param year_end: end year
+    :return: pd.DataFrame of the selected rows
+    """
+    return select_time_range(df, *_year_range(year_start, year_end))
+
+# Columns with row-position indexes, plus "Year" from DateTime
+INDEXED_COLUMNS = ("Station", "Code", "Line", "Bound")
+
+
+def _position_index(values) -> dict:
+    """
+    Index rows by value
+    :param values: column values, e.g. a categorical Series
+    :return: dict of value to sorted array of row positions
+    """
+    codes, uniques = pd.factorize(values)
+    order = np.argsort(codes, kind="stable") # stable: positions stay sorted within each value
+    order = order[codes[order] >= 0] # skip missing values
+    bounds = np.cumsum(np.bincount(codes[codes >= 0], minlength=len(uniques)))[:-1]
+    return dict(zip(uniques, np.split(order, bounds)))
+
+def _build_indexes(df: pd.DataFrame) -> dict:
+    """
+    Build row-position indexes for the indexed columns that were loaded, and for the year
+    :param df: loaded pd.DataFrame
+    :return: dict of column to position index
+    """
+    indexes = {col: _position_index(df[col]) for col in INDEXED_COLUMNS if col in df.columns}
+    indexes["Year"] = _position_index(df["DateTime"].dt.year.to_numpy())
+    return indexes
+
+# Memory limit of the query cache, counting the cached row-position arrays
+QUERY_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _normalize_plan(plan: list[tuple]) -> tuple:
+    """
+    Normalize a filter plan into a cache key: filters are ANDed, so order and repeats do not matter
+    :param plan: filters, e.g. [("isin", "Code", ("SUDP", "MUPR1")), ("eq", "Line", "YU")]
+    :return: sorted tuple of filters
+    """
+    normalized = set()
+    for op, *args in plan:
+        if op == "isin":
+            args = [args[0], tuple(sorted(set(args[1]), key=repr))]
+        normalized.add((op, *args))
+    return tuple(sorted(normalized, key=repr))
+
+
+class _QueryCache:
+    """
+    LRU cache of filter plan results, as row positions in the loaded df, evicted by memory use
+    """
+
+    def __init__(self, max_bytes: int = QUERY_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict() # (dataset token, normalized plan): row positions
+
+    def get(self, key: tuple) -> np.ndarray | None:
+        positions = self._entries.get(key)
+        if positions is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return positions
+
+    def put(self, key: tuple, positions: np.ndarray):
+        if key in self._entries or positions.nbytes > self.max_bytes:
+            return
+        positions.flags.writeable = False # shared by later hits
+        self._entries[key] = positions
+        self.nbytes += positions.nbytes
+        while self.nbytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+
+    def invalidate(self, dataset: tuple):
+        """Drop entries for other versions of the dataset path, e.g. a file rewritten in place"""
+        for key in [key for key in self._entries if key[0][0] == dataset[0] and key[0][:2] != dataset[:2]]:
+            self.nbytes -= self._entries.pop(key).nbytes
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = self.hits = self.misses = 0
+
+    def info(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries),
+                "nbytes": self.nbytes, "max_bytes": self.max_bytes}
 
 
 class TTCLoader:
     """
-    Lightweight loader for TTC delay data
+    Lightweight loader for TTC delay data.
+    Filters are lazy: each one adds a predicate to a plan, and the plan is evaluated in one pass, with one copy of the
+    selected rows, when `.df` is next accessed.
+    Filters on Station, Code, Line, Bound and year are answered from row-position indexes built on first use, and
+    time filters by binary search on the sorted DateTime column; the remaining filters are evaluated as masks on the
+    rows those select. Filters that only restrict time return a slice of df_orig without copying.
+    Results of filter plans run on df_orig are kept in an LRU cache shared by all loaders, keyed by the loaded dataset
+    and the normalized plan, so repeated queries skip evaluation.
+    The loaded frame (`df_orig`) is never modified or copied: an unfiltered `.df` is a shallow copy of it, so adding
+    columns is safe, but values should only be changed in place with copy-on-write on (see `enable_copy_on_write`).
     """
 
     # class variables
+    _query_cache = _QueryCache()
     _code_info: pd.DataFrame|None = None
     _code_description_dict: dict |None = None
     _code_category_dict: dict |None = None
@@ -47,21 +217,241 @@ class TTCLoader:
         cls._load_code_descriptions_file()
         return MappingProxyType(cls._category_reasoning_dict)
 
+    @classmethod
+    def cache_info(cls) -> dict:
+        """Query cache hits, misses, entries and memory use"""
+        return cls._query_cache.info()
+
+    @classmethod
+    def clear_cache(cls):
+        """Empty the query cache and reset its counters"""
+        cls._query_cache.clear()
+
 
 
-    def __init__(self, processed_delay_dir = PROCESSED_DELAY_DIR, autoload = True):
+    def __init__(self, processed_delay_dir = PROCESSED_DELAY_DIR, autoload = True,
+                 years: Iterable[int] | None = None, columns: Iterable[str] | None = None, version: str | None = None):
+        """
+        :param processed_delay_dir: directory of processed delay data
+        :param autoload: If True, load the most recently processed data
+        :param version: dataset id from the manifest (or a unique prefix) to load instead of the latest dataset
+        :param years: years to load, e.g. range(2023, 2026). None loads all years
+        :param columns: columns to load, e.g. ["Station", "Min Delay"]. DateTime is always loaded. None loads all columns
+        """
         self.processed_delay_dir = processed_delay_dir
-        self.df_orig = None
-        self.df = None
+        self.version = version
+        self.dataset = None # manifest entry of the loaded dataset (id, sha256, rows, ...), None if not in the manifest
+        self.years = None if years is None else sorted(set(years))
+        self.columns = None
+        if columns is not None:
+            # DateTime is needed by the year, time and weekday filters
+            self.columns = list(dict.fromkeys(["DateTime", *columns]))
+        self.df_orig = None # loaded df, shared and never modified
+        self._indexes = None # column: {value: sorted row positions in df_orig}, built on first use
+        self._df = None # working df before any pending filters, None for the unfiltered df_orig
+        self._positions = None # row positions of _df in df_orig, None if unknown (df set by caller)
+        self._plan = [] # pending filters, e.g. ("isin", "Code", ("SUDP",))
+        self._dataset_token = None # identifies the loaded data in the query cache
         self.code_category_dict = None
         if autoload:
-            df = self._load_data()
-            self.df_orig = df # cached df
-            self.df = df.copy()
+            self._set_df_orig(self._load_data())
+
+    def share(self) -> str:
+        """
+        Share the loaded df with other processes through shared memory, see `from_shared`.
+        Call `shared_dataset.release_dataframe(path)` when the workers are done.
+        :return: path to pass to worker processes
+        """
+        if self.df_orig is None:
+            self.reload()
+        metadata = {"processed_delay_dir": self.processed_delay_dir, "years": self.years, "columns": self.columns,
+                    "dataset": self.dataset, "dataset_token": self._dataset_token}
+        return shared_dataset.share_dataframe(self.df_orig, metadata)
 
+    @classmethod
+    def from_shared(cls, path: str) -> Self:
+        """
+        Create a loader attached, without copying, to data shared by `share` in another process
+        :param path: path returned by `share`
+        :return: TTCLoader over the shared, read-only data
+        """
+        df, metadata = shared_dataset.attach_dataframe(path)
+        loader = cls(metadata["processed_delay_dir"], autoload=False, years=metadata["years"],
+                     columns=metadata["columns"])
+        loader.dataset = metadata["dataset"]
+        token = metadata["dataset_token"]
+        loader._dataset_token = None if token is None else (
+            token[0], token[1], None if token[2] is None else tuple(token[2]))
+        loader._set_df_orig(df)
+        return loader
+
+    def _set_df_orig(self, df: pd.DataFrame):
+        """Set loaded df; its indexes are built when a filter first needs them"""
+        self.df_orig = df
+        self._indexes = None
+        # the pipeline writes data sorted by DateTime; time filters fall back to masks if it is not
+        self._sorted_by_time = df["DateTime"].is_monotonic_increasing
+
+    @property
+    def df(self) -> pd.DataFrame | None:
+        """Working df, with all filters applied"""
+        if self.df_orig is None and self._df is None:
+            return None
+        if self._plan:
+            self._df, self._positions = self._cached_evaluate_plan(self._plan)
+            self._plan = []
+        elif self._df is None:
+            # shallow copy: columns added by callers stay out of df_orig
+            self._df = self.df_orig.copy(deep=False)
+            self._positions = np.arange(len(self.df_orig))
+        return self._df
+
+    @df.setter
+    def df(self, df: pd.DataFrame | None):
+        self._df = df # None resets to df_orig
+        self._positions = None
+        self._plan = []
+
+    def _index_lookup(self, predicate: tuple) -> np.ndarray | None:
+        """
+        Answer a filter from the indexes
+        :param predicate: filter in the plan, e.g. ("isin", "Code", ("SUDP",))
+        :return: sorted row positions in df_orig, or None if the filter is not indexed
+        """
+        op, *args = predicate
+        if self._indexes is None:
+            self._indexes = _build_indexes(self.df_orig)
+        if op in ("eq", "isin") and args[0] in self._indexes:
+            index = self._indexes[args[0]]
+            values = [args[1]] if op == "eq" else args[1]
+        elif op == "years_between":
+            index = self._indexes["Year"]
+            values = [year for year in index if args[0] <= year <= args[1]]
+        elif op == "month" and self._sorted_by_time:
+            # one contiguous range per year
+            datetimes = self.df_orig["DateTime"]
+            ranges = [_search_time_range(datetimes, start, start + pd.DateOffset(months=1))
+                      for start in (pd.Timestamp(year=year, month=args[0], day=1) for year in self._indexes["Year"])]
+            return np.concatenate([np.arange(lo, hi) for lo, hi in ranges] or [np.array([], dtype=np.intp)])
+        else:
+            return None
+        positions = [index[v] for v in values if v in index]
+        if not positions:
+            return np.array([], dtype=np.intp)
+        return positions[0] if len(positions) == 1 else np.sort(np.concatenate(positions))
+
+    def _time_bounds(self, predicate: tuple) -> tuple[int, int] | None:
+        """
+        Answer a time filter by binary search on the sorted DateTime column
+        :param predicate: filter in the plan, e.g. ("years_between", 2023, 2025)
+        :return: row positions [lo, hi) in df_orig, or None if not a time filter or the data is not sorted
+        """
+        op, *args = predicate
+        if not self._sorted_by_time or op not in ("time_range", "years_between"):
+            return None
+        start, end = args if op == "time_range" else _year_range(*args)
+        return _search_time_range(self.df_orig["DateTime"], start, end)
+
+    def _evaluate_plan(self, plan: list[tuple]) -> tuple[pd.DataFrame, np.ndarray | None]:
+        """
+        Select the rows matching all filters in the plan, with one pass per filter and one copy of the result.
+        Indexed filters are intersected first; the other filters are evaluated as masks on the rows left.
+        :param plan: filters, e.g. [("isin", "Code", ("SUDP",)), ("eq", "Line", "YU")]
+        :return: filtered pd.DataFrame and its row positions in df_orig (None if unknown)
+        """
+        source = self.df_orig if self._df is None else self._df
+        source_positions = None if self._df is None else self._positions
+        indexed = self._df is None or source_positions is not None
+
+        lo, hi = 0, len(self.df_orig) # row range in df_orig left by the time filters
+        selected = None # sorted row positions in df_orig left by the indexed filters
+        mask_plan = []
+        for predicate in plan:
+            bounds = self._time_bounds(predicate) if indexed else None
+            if bounds is not None:
+                lo, hi = max(lo, bounds[0]), min(hi, bounds[1])
+                continue
+            positions = self._index_lookup(predicate) if indexed else None
+            if positions is None:
+                mask_plan.append(predicate)
+            elif selected is None:
+                selected = positions
+            else:
+                selected = np.intersect1d(selected, positions, assume_unique=True)
+
+        # row range of source left by the time filters; source rows are in df_orig order
+        if not indexed:
+            start, stop = 0, len(source)
+        elif source_positions is None:
+            start, stop = lo, max(lo, hi)
+        else:
+            start, stop = np.searchsorted(source_positions, [lo, max(lo, hi)])
+
+        # rows of source to keep, None for all of start:stop
+        rows = None
+        if selected is not None:
+            rows = selected if source_positions is None else (
+                np.intersect1d(source_positions, selected, assume_unique=True, return_indices=True)[1])
+            rows = rows[np.searchsorted(rows, start):np.searchsorted(rows, stop)]
+
+        if mask_plan:
+            df = source.iloc[start:stop] if rows is None else source.take(rows)
+            mask = np.ones(len(df), dtype=bool)
+            for op, *args in mask_plan:
+                mask &= _PLAN_MASKS[op](df, *args).to_numpy(dtype=bool)
+            keep = np.flatnonzero(mask)
+            rows = keep + start if rows is None else rows[keep]
+
+        if rows is None:
+            # contiguous rows: a view of source, shallow-copied so added columns stay out of source
+            df = source.iloc[start:stop].copy(deep=False)
+            rows = np.arange(start, stop)
+        else:
+            df = source.take(rows)
+
+        if not indexed:
+            return df, None
+        return df, rows if source_positions is None else source_positions[rows]
+
+    def _cached_evaluate_plan(self, plan: list[tuple]) -> tuple[pd.DataFrame, np.ndarray | None]:
+        """Evaluate the plan, using the query cache when it runs on df_orig"""
+        if self._df is not None or self._dataset_token is None:
+            return self._evaluate_plan(plan)
+        try:
+            key = (self._dataset_token, _normalize_plan(plan))
+            hash(key)
+        except TypeError: # unhashable filter values
+            return self._evaluate_plan(plan)
+
+        positions = self._query_cache.get(key)
+        if positions is None:
+            df, positions = self._evaluate_plan(plan)
+            self._query_cache.put(key, positions)
+            return df, positions
+        if len(positions) and positions[-1] - positions[0] + 1 == len(positions):
+            # contiguous rows: a view of df_orig, shallow-copied so added columns stay out of it
+            return self.df_orig.iloc[positions[0]:positions[-1] + 1].copy(deep=False), positions
+        return self.df_orig.take(positions), positions
+
+    def _add_filter(self, op: str, *args) -> Self:
+        """Add a filter to the plan, evaluated when df is next accessed"""
+        self._plan.append((op, *args))
+        return self
+
+
+    def _resolve_dataset(self) -> tuple[str | None, dict | None]:
+        """
+        Find the dataset to load: the pinned version or the latest dataset in the manifest, falling back to the most
+        recently modified file for data processed without a manifest
+        :return: dataset path (None if nothing found) and its manifest entry (None if not in the manifest)
+        """
+        entry = manifest_utils.resolve_dataset(self.processed_delay_dir, self.version)
+        if entry is not None:
+            return entry["path"], entry
+        return self._get_latest_file(), None
 
     def _get_latest_file(self) -> str | None:
-        """Get filename of the most recently processed data"""
+        """Get path of the most recently processed data, a Parquet dataset folder or (older runs) a CSV file"""
         # Step 1: Get all subfolders
         folders = [os.path.join(self.processed_delay_dir, d) for d in os.listdir(self.processed_delay_dir)
                    if os.path.isdir(os.path.join(self.processed_delay_dir, d))]
@@ -72,8 +462,9 @@ class TTCLoader:
         # Find the latest folder by modification time
         latest_folder = max(folders, key=os.path.getmtime)
 
+        # datasets written as year-partitioned Parquet folders, skipping folders still being written
         files = [os.path.join(latest_folder, f) for f in os.listdir(latest_folder)
-                   if os.path.isfile(os.path.join(latest_folder, f))]
+                   if not f.endswith('.tmp')]
 
         if not files:
             return None
@@ -83,18 +474,39 @@ class TTCLoader:
 
         return latest_file
 
+    def available_years(self) -> list[int]:
+        """Years available in the most recently processed data, without loading it"""
+        latest_file, _ = self._resolve_dataset()
+        if latest_file is None:
+            raise FileNotFoundError("No processed data found.")
+        if os.path.isdir(latest_file):
+            return list(file_utils.parquet_dataset_partitions(latest_file))
+        dates = pd.read_csv(latest_file, usecols=["DateTime"])["DateTime"]
+        return sorted(pd.to_datetime(dates, format='%Y-%m-%d %H:%M:%S').dt.year.unique().tolist())
+
     def _load_data(self) -> pd.DataFrame:
-        """Load most recently processed data"""
-        latest_file = self._get_latest_file()
+        """Load most recently processed data, only reading the requested years and columns"""
+        latest_file, self.dataset = self._resolve_dataset()
         if latest_file is None:
             raise FileNotFoundError("No processed data found.")
-        df = file_utils.read_csv(latest_file)
-        df['DateTime'] = pd.to_datetime(df['DateTime'],format='%Y-%m-%d %H:%M:%S',  # matches YYYY-MM-DD HH:MM:SS
-            errors='coerce'
-        )
-        df['Min Delay'] = pd.to_numeric(df['Min Delay'], errors='coerce')
-        df['Min Gap'] = pd.to_numeric(df['Min Gap'], errors='coerce')
-        df['Vehicle'] = pd.to_numeric(df['Vehicle'], errors='coerce')
+        # cached query results are tied to the dataset version (content hash, or mtime without a manifest)
+        # and the years loaded
+        version = self.dataset["sha256"] if self.dataset else os.path.getmtime(latest_file)
+        self._dataset_token = (latest_file, version, None if self.years is None else tuple(self.years))
+        self._query_cache.invalidate(self._dataset_token)
+        if os.path.isdir(latest_file):
+            # columnar dataset, already typed; one partition per year
+            df = file_utils.read_parquet_dataset(latest_file, self.years, self.columns)
+        else:
+            df = pd.read_csv(latest_file, usecols=self.columns)
+            df['DateTime'] = pd.to_datetime(df['DateTime'],format='%Y-%m-%d %H:%M:%S',  # matches YYYY-MM-DD HH:MM:SS
+                errors='coerce'
+            )
+            for col in ['Min Delay', 'Min Gap', 'Vehicle']:
+                if col in df.columns:
+                    df[col] = pd.to_numeric(df[col], errors='coerce')
+            if self.years is not None:
+                df = df[df['DateTime'].dt.year.isin(self.years)].reset_index(drop=True)
 
         # check if columns have nans
         bad_columns = df.isna().any()
@@ -102,101 +514,89 @@ class TTCLoader:
         # check if entire dataframe has any nans:
         assert not bad_columns.any(), f"NaNs found in columns: {bad_columns[bad_columns].index.tolist()}"
 
-        return df
+        # compact dtypes; a no-op for datasets written by the pipeline
+        return schema.apply_schema(df)
 
 
     def reload(self) -> Self:
-        """Reset working df from in-memory."""
+        """Reset working df to the in-memory df_orig, without copying it."""
         if self.df_orig is None:
             # If nothing cached yet, load from disk once.
-            df = self._load_data()
-            self.df_orig = df
-            self.df = df.copy()
-        else:
-            self.df = self.df_orig.copy()
+            self._set_df_orig(self._load_data())
+        self.df = None
         return self
 
     # ---------- Filters ----------
 
     def filter_selected_year(self, year:int) -> Self:
         """Filter data by year"""
-        self.df = self.df[self.df['DateTime'].dt.year == year].copy()
-        return self
+        return self._add_filter("years_between", year, year)
 
     def filter_selected_years(self, year_start:int, year_end:int) -> Self:
         """Filter data by year range"""
-        self.df = self.df[self.df['DateTime'].dt.year.between(year_start, year_end)].copy()
-        return self
+        return self._add_filter("years_between", year_start, year_end)
 
-    def filter_month(self, month)-> Self:
-        """Filter data by month"""
-        self.df = self.df[self.df["Month"] == month].copy()
-        return self
+    def filter_month(self, month:int)-> Self:
+        """Filter data by month of the year, e.g. 3 for March of every year"""
+        return self._add_filter("month", month)
+
+    def filter_time_range(self, start = None, end = None) -> Self:
+        """Filter data by time range, start <= DateTime < end, e.g. ("2024-03-01", "2024-04-01")"""
+        start = None if start is None else pd.Timestamp(start)
+        end = None if end is None else pd.Timestamp(end)
+        return self._add_filter("time_range", start, end)
 
     def filter_selected_delay(self, min_start:int, min_end:int)-> Self:
         """Filter data by delay time range"""
-        self.df = self.df[self.df['Min Delay'].between(min_start, min_end)].copy()
-        return self
+        return self._add_filter("between", "Min Delay", min_start, min_end)
 
     def filter_morning_rush_hour(self)-> Self:
         """Filter data by morning rush hour"""
-        self.df = self.df[self.df['Rush Hour'] == "Morning"].copy()
-        return self
+        return self._add_filter("eq", "Rush Hour", "Morning")
 
     def filter_evening_rush_hour(self)-> Self:
         """Filter data by evening rush hour"""
-        self.df = self.df[self.df['Rush Hour'] == "Evening"].copy()
-        return self
+        return self._add_filter("eq", "Rush Hour", "Evening")
 
     def filter_off_peak(self)-> Self:
         """Filter data by off-peak time"""
-        self.df = self.df[self.df['Rush Hour'] == "Off-peak"].copy()
-        return self
+        return self._add_filter("eq", "Rush Hour", "Off-peak")
 
     def filter_weekdays(self)-> Self:
         """Filter data by weekdays"""
-        self.df = self.df[self.df['DateTime'].dt.weekday < 5].copy()
-        return self
+        return self._add_filter("weekend", False)
 
     def filter_weekend(self)-> Self:
         """Filter data by weekend"""
-        self.df = self.df[self.df['DateTime'].dt.weekday >= 5].copy()
-        return self
+        return self._add_filter("weekend", True)
 
     def filter_selected_stations(self, stations: list)-> Self:
         """Filter data by station name"""
-        self.df = self.df[self.df['Station'].isin(stations)].copy()
-        return self
+        return self._add_filter("isin", "Station", tuple(stations))
 
     def filter_delay_code(self, code:list)-> Self:
         """Filter data by delay code"""
-        self.df = self.df[self.df["Code"].isin(code)].copy()
-        return self
+        return self._add_filter("isin", "Code", tuple(code))
 
     def filter_line(self, line)-> Self:
         """Filter data by line"""
-        self.df = self.df[self.df["Line"] == line].copy()
-        return self
+        return self._add_filter("eq", "Line", line)
 
     def filter_bound(self, bound)-> Self:
         """Filter data by bound"""
-        self.df = self.df[self.df["Bound"] == bound].copy()
-        return self
+        return self._add_filter("eq", "Bound", bound)
 
     def filter_season(self, season)-> Self:
         """Filter data by season"""
-        self.df = self.df[self.df["Season"] == season].copy()
-        return self
+        return self._add_filter("eq", "Season", season)
 
     def filter_vehicle(self, vehicle)-> Self:
         """Filter data by vehicle number"""
-        self.df = self.df[self.df["Vehicle"] == vehicle].copy()
-        return self
+        return self._add_filter("eq", "Vehicle", vehicle)
 
     def filter_category(self, category):
         """ Filter data by delay category, e.g. Patron"""
-        self.df = self.df[self.df["Delay Category"] == category].copy()
-        return self
+        return self._add_filter("eq", "Delay Category", category)
 
     def clear_filters(self):
         """Clears filters"""
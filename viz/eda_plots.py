@@ -215,7 +215,7 @@ def plot_delay_category_trend_by_year(df:pd.DataFrame, unit: str = "minutes", to
 
     yearly_cat = (
         df
-        .groupby([df["DateTime"].dt.year.rename("Year"), "Delay Category"])["Min Delay"]
+        .groupby([df["DateTime"].dt.year.rename("Year"), "Delay Category"], observed=True)["Min Delay"]
         .sum()
         .reset_index(name="Total Delay")
     )
@@ -271,7 +271,7 @@ def plot_delay_description_trend_by_year(df:pd.DataFrame, category:str = None, u
 
     yearly_cat = (
         df
-        .groupby([df["DateTime"].dt.year.rename("Year"), "Public Description"])["Min Delay"]
+        .groupby([df["DateTime"].dt.year.rename("Year"), "Public Description"], observed=True)["Min Delay"]
         .sum()
         .reset_index(name="Total Delay")
     )
@@ -340,7 +340,7 @@ def plot_station_trend_by_year(df:pd.DataFrame, unit: str = "minutes", top_n: in
         factors = CONVERSION_FACTORS
         yearly_cat = (
             df
-            .groupby([df["DateTime"].dt.year.rename("Year"), "Station"])["Min Delay"]
+            .groupby([df["DateTime"].dt.year.rename("Year"), "Station"], observed=True)["Min Delay"]
             .sum()
             .reset_index(name="Total Delay")
         )
@@ -353,7 +353,7 @@ def plot_station_trend_by_year(df:pd.DataFrame, unit: str = "minutes", top_n: in
     else:
 
         yearly_cat = (
-            df.groupby([df["DateTime"].dt.year.rename("Year"), "Station"])
+            df.groupby([df["DateTime"].dt.year.rename("Year"), "Station"], observed=True)
             .size()
             .reset_index(name="Total Delay")
         )
@@ -413,7 +413,7 @@ def plot_consistently_top_station_trend(df:pd.DataFrame, unit: str = "minutes",
 
 
     yearly = (
-        df_filtered.groupby(["Year", "Station"])["Min Delay"]
+        df_filtered.groupby(["Year", "Station"], observed=True)["Min Delay"]
         .sum()
         .reset_index(name = "Total Delay")
     )
@@ -457,7 +457,7 @@ def plot_line_trends_by_year(df:pd.DataFrame, unit: str = "minutes") -> go.Figur
     factors = CONVERSION_FACTORS
 
     yearly = (
-        df.groupby([df["DateTime"].dt.year.rename("Year"), "Line"])["Min Delay"]
+        df.groupby([df["DateTime"].dt.year.rename("Year"), "Line"], observed=True)["Min Delay"]
           .sum()
           .reset_index(name="Total Delay")
     )
@@ -471,7 +471,7 @@ def plot_line_trends_by_year(df:pd.DataFrame, unit: str = "minutes") -> go.Figur
         "YU": "Yonge–University",
         "SHP": "Sheppard",
     }
-    yearly["Line"] = yearly["Line"].replace(label_map)
+    yearly["Line"] = yearly["Line"].astype(str).replace(label_map)
 
 
     # plot bar graph
@@ -533,7 +533,7 @@ def plot_rush_hour_trends_by_year(df:pd.DataFrame, unit: str = "minutes") -> go.
 
     df["Year"] = df["DateTime"].dt.year
     rush = (
-        df.groupby(["Year", "Rush Hour"], as_index=False)
+        df.groupby(["Year", "Rush Hour"], as_index=False, observed=True)
         .agg(
             Delays=("Min Delay", "count"),  # number of delay events
             TotalMinutes=("Min Delay", "sum")  # total delay time in minutes (sum of Min Delay)
@@ -550,7 +550,7 @@ def plot_rush_hour_trends_by_year(df:pd.DataFrame, unit: str = "minutes") -> go.
         "Off-peak: Afternoon": "Off-Peak: Weekday 9am - 3pm",
         "Off-peak: Night" : "Off-peak: Weekday 7pm - 2am",
     }
-    rush["Rush Hour"] = rush["Rush Hour"].replace(label_map)
+    rush["Rush Hour"] = rush["Rush Hour"].astype(str).replace(label_map)
 
     fig = px.bar(
         rush,
@@ -586,7 +586,7 @@ def plot_season_trends_by_year(df:pd.DataFrame, unit: str = "minutes") -> go.Fig
 
     df["Year"] = df["DateTime"].dt.year
     season = (
-        df.groupby(["Year", "Season"], as_index=False)
+        df.groupby(["Year", "Season"], as_index=False, observed=True)
         .agg(
             Delays=("Min Delay", "count"),  # number of delay events
             TotalMinutes=("Min Delay", "sum")  # total delay time in minutes (sum of Min Delay)
@@ -603,7 +603,7 @@ def plot_season_trends_by_year(df:pd.DataFrame, unit: str = "minutes") -> go.Fig
         "Summer": "Summer: Jun - Aug",
         "Fall": "Fall: Sep - Nov"
     }
-    season["Season"] = season["Season"].replace(label_map)
+    season["Season"] = season["Season"].astype(str).replace(label_map)
 
     fig = px.bar(
         season,
@@ -26,7 +26,7 @@ def get_consistently_top_stations(df: pd.DataFrame, top_n: int = 10, last_n_year
     # Get total delay per year
 
     yearly = (
-        df.groupby(["Year","Station"])["Min Delay"]
+        df.groupby(["Year","Station"], observed=True)["Min Delay"]
         .sum()
         .reset_index(name="Total Delay")
     )
@@ -117,7 +117,7 @@ def get_top_stations_w_track_intrusions(df, top_n = 5, last_n_years = None):
     # Get total delay per year
 
     yearly = (
-        df.groupby(["Year","Station"])["Min Delay"]
+        df.groupby(["Year","Station"], observed=True)["Min Delay"]
         .sum()
         .reset_index(name="Total Delay")
     )